@@ -0,0 +1,71 @@
+"""Индекс ингредиентов в памяти для автодополнения."""
+
+from bisect import bisect_left
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+
+from .cache import get_version
+from recipes.models import Ingredient
+
+
+class IngredientIndex:
+    """Отсортированный список ингредиентов с поиском по началу названия.
+
+    Загружается из БД при первом обращении и перечитывается при
+    смене версии справочника ингредиентов в кэше, а также не реже
+    чем раз в INGREDIENT_INDEX_TTL секунд.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._keys = None
+        self._items = None
+        self._loaded_at = 0
+        self._version = None
+
+    def _load(self):
+        items = sorted(
+            (
+                {'id': pk, 'name': name, 'measurement_unit': unit}
+                for pk, name, unit in Ingredient.objects.values_list(
+                    'id', 'name', 'measurement_unit'
+                ).iterator()
+            ),
+            key=lambda item: (item['name'].casefold(), item['name'])
+        )
+        return [item['name'].casefold() for item in items], items
+
+    def _get(self):
+        version = get_version('ingredients')
+        with self._lock:
+            expired = (
+                monotonic() - self._loaded_at
+                > settings.INGREDIENT_INDEX_TTL
+            )
+            if self._keys is None or expired or version != self._version:
+                self._keys, self._items = self._load()
+                self._loaded_at = monotonic()
+                self._version = version
+            return self._keys, self._items
+
+    def search(self, prefix, limit):
+        """Возвращает до limit ингредиентов, начинающихся с prefix."""
+        keys, items = self._get()
+        prefix = prefix.casefold()
+        result = []
+        for position in range(bisect_left(keys, prefix), len(keys)):
+            if len(result) >= limit or not keys[position].startswith(prefix):
+                break
+            result.append(items[position])
+        return result
+
+    def invalidate(self):
+        """Сбрасывает индекс; он будет загружен при следующем поиске."""
+        with self._lock:
+            self._keys = None
+            self._items = None
+
+
+ingredient_index = IngredientIndex()
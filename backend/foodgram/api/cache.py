@@ -0,0 +1,79 @@
+"""Кэширование ответов для справочников."""
+
+from hashlib import md5
+from time import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, urlencode
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+VERSION_KEY = 'reference:{}:version'
+
+
+def get_version(namespace):
+    """Возвращает время последнего изменения справочника.
+
+    Пока справочник не менялся или версия вытеснена из кэша,
+    возвращается 0: иначе Last-Modified сдвигался бы вперед после
+    каждого перезапуска и различался бы между процессами.
+    """
+    version = cache.get(VERSION_KEY.format(namespace))
+    return 0 if version is None else version
+
+
+def bump_version(namespace):
+    """Делает устаревшими все закэшированные ответы справочника."""
+    cache.set(VERSION_KEY.format(namespace), time(), timeout=None)
+
+
+class ReferenceCacheMixin:
+    """Кэширует list и retrieve справочника и отвечает 304.
+
+    Ключ строится из версии справочника, действия, pk и параметров
+    запроса; версия меняется сигналами при изменении моделей.
+    """
+
+    cache_namespace = None
+
+    def get_cache_key(self, request, version):
+        params = urlencode(sorted(request.query_params.lists()), doseq=True)
+        return (
+            f'reference:{self.cache_namespace}:{version}:{self.action}:'
+            f'{self.kwargs.get("pk", "")}:{params}'
+        )
+
+    def get_cached_response(self, method, request, *args, **kwargs):
+        version = get_version(self.cache_namespace)
+        key = self.get_cache_key(request, version)
+        cached = cache.get(key)
+        if cached is None:
+            response = method(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            etag = '"{}"'.format(
+                md5(JSONRenderer().render(response.data)).hexdigest()
+            )
+            cached = (response.data, etag)
+            cache.set(key, cached, settings.REFERENCE_CACHE_TIMEOUT)
+        data, etag = cached
+        last_modified = int(version)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        response = not_modified or Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
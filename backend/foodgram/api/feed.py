@@ -0,0 +1,41 @@
+"""Лента рецептов авторов из подписок."""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Recipe
+from users.models import Subscriber
+
+CACHE_KEY = 'feed:{}'
+
+
+def get_feed_queryset(user):
+    """Возвращает рецепты авторов, на которых подписан user.
+
+    Обычно это один запрос с author IN (подзапрос подписок), который
+    читается по индексу (author, -id). Для пользователей
+    с FEED_CACHE_FOLLOWING_THRESHOLD и более подписками первые
+    FEED_CACHE_SIZE id ленты кэшируются на FEED_CACHE_TIMEOUT секунд,
+    и лента ограничена ими.
+    """
+    key = CACHE_KEY.format(user.pk)
+    ids = cache.get(key)
+    if ids is not None:
+        return Recipe.objects.filter(id__in=ids)
+    subscriptions = Subscriber.objects.filter(user=user)
+    queryset = Recipe.objects.filter(
+        author__in=subscriptions.values('author')
+    )
+    threshold = settings.FEED_CACHE_FOLLOWING_THRESHOLD
+    if subscriptions[threshold - 1:threshold].exists():
+        ids = list(queryset.order_by('-id').values_list(
+            'id', flat=True
+        )[:settings.FEED_CACHE_SIZE])
+        cache.set(key, ids, settings.FEED_CACHE_TIMEOUT)
+        return Recipe.objects.filter(id__in=ids)
+    return queryset
+
+
+def invalidate_feed(user_id):
+    """Сбрасывает кэшированную ленту пользователя."""
+    cache.delete(CACHE_KEY.format(user_id))
@@ -1,15 +1,130 @@
 import base64
+import binascii
+from io import BytesIO
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile,
+    TemporaryUploadedFile
+)
 from rest_framework import serializers
 
+BASE64_PREFIX = ';base64,'
+HEADER_LENGTH = 64
+CHUNK_LENGTH = 64 * 1024
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'RIFF', 'webp'),
+)
+
+
+def detect_format(head):
+    """Определяет формат изображения по первым байтам."""
+    for signature, format in SIGNATURES:
+        if head.startswith(signature):
+            if format == 'webp' and head[8:12] != b'WEBP':
+                return None
+            return format
+    return None
+
 
 class Base64ImageField(serializers.ImageField):
-    """Вспомогательный сериализатор для загрузки изображений."""
+    """Вспомогательный сериализатор для загрузки изображений.
+
+    Строка base64 декодируется частями прямо в файл загрузки:
+    размер проверяется до декодирования, формат - по первому
+    блоку, а большие файлы сразу пишутся во временный файл на диске.
+    """
+
+    default_error_messages = {
+        'too_large': 'Размер изображения не должен превышать {max_size} байт',
+        'invalid_format': 'Допустимые форматы изображений: {formats}',
+        'invalid_base64': 'Некорректные данные изображения',
+    }
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = self.decode(data)
         return super().to_internal_value(data)
+
+    def decode(self, data):
+        start = data.find(BASE64_PREFIX, 0, HEADER_LENGTH)
+        if start == -1:
+            self.fail('invalid_base64')
+        start += len(BASE64_PREFIX)
+        max_size = settings.IMAGE_UPLOAD_MAX_SIZE
+        size = (len(data) - start) * 3 // 4 - data.count('=', -2)
+        if size > max_size:
+            self.fail('too_large', max_size=max_size)
+        formats = settings.IMAGE_UPLOAD_FORMATS
+        if data[len('data:image/'):start - len(BASE64_PREFIX)] not in formats:
+            self.fail('invalid_format', formats=', '.join(formats))
+        chunks = self.decode_chunks(data, start)
+        head = next(chunks, b'')
+        format = detect_format(head)
+        if format not in formats:
+            self.fail('invalid_format', formats=', '.join(formats))
+        name = f'temp.{format}'
+        content_type = f'image/{format}'
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            file = TemporaryUploadedFile(name, content_type, size, None)
+        else:
+            file = InMemoryUploadedFile(
+                BytesIO(), None, name, content_type, size, None
+            )
+        file.write(head)
+        for chunk in chunks:
+            file.write(chunk)
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+    def decode_chunks(self, data, start):
+        """Декодирует base64 блоками, кратными четырем символам."""
+        for position in range(start, len(data), CHUNK_LENGTH):
+            try:
+                yield base64.b64decode(
+                    data[position:position + CHUNK_LENGTH], validate=True
+                )
+            except binascii.Error:
+                self.fail('invalid_base64')
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список первичных ключей, проверяемый одним запросом.
+
+    Вместо запроса на каждый ключ все объекты загружаются через
+    in_bulk, а в ошибке перечисляются сразу все неизвестные ключи.
+    """
+
+    default_error_messages = {
+        'does_not_exist': 'Объекты не найдены: {pks}',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        pks = []
+        for item in data:
+            if isinstance(item, bool) or not isinstance(item, (int, str)):
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(item).__name__
+                )
+            try:
+                pks.append(int(item))
+            except ValueError:
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(item).__name__
+                )
+        objects = self.child_relation.get_queryset().in_bulk(set(pks))
+        missing = [pk for pk in dict.fromkeys(pks) if pk not in objects]
+        if missing:
+            self.fail(
+                'does_not_exist', pks=', '.join(map(str, missing))
+            )
+        return [objects[pk] for pk in pks]
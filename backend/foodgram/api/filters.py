@@ -1,24 +1,58 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
+from django.db.models.functions import Upper
 from django_filters.rest_framework import filters, FilterSet
+from rest_framework.exceptions import ValidationError
 
 from recipes.models import Ingredient, Recipe, Tag
 
 
+RANKING_ORDERINGS = {
+    'popular': 'ranking__popularity',
+    'trending': 'ranking__trending',
+}
+
+
 class RecipeFilter(FilterSet):
     """Фильтр рецептов."""
 
     tags = filters.ModelMultipleChoiceFilter(
         queryset=Tag.objects.all(), field_name='tags__slug',
-        to_field_name='slug',
+        to_field_name='slug', method='get_tags'
     )
+    tags_all = filters.BooleanFilter(method='get_tags_all')
     is_favorited = filters.BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    ordering = filters.CharFilter(method='get_ordering')
 
     class Meta:
         model = Recipe
         fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
 
+    def get_tags(self, queryset, name, value):
+        """Фильтрация по тэгам через EXISTS без дублей рецептов.
+
+        По умолчанию рецепт должен иметь любой из тэгов,
+        при tags_all=true - все перечисленные тэги.
+        """
+        if not value:
+            return queryset
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk')
+        )
+        if self.form.cleaned_data.get('tags_all'):
+            for tag in value:
+                queryset = queryset.filter(Exists(recipe_tags.filter(tag=tag)))
+            return queryset
+        return queryset.filter(Exists(recipe_tags.filter(tag__in=value)))
+
+    def get_tags_all(self, queryset, name, value):
+        """Режим учитывается в get_tags."""
+        return queryset
+
     def get_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
             return queryset.filter(favorite__user=self.request.user)
@@ -29,12 +63,47 @@ class RecipeFilter(FilterSet):
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
 
+    def get_ordering(self, queryset, name, value):
+        """Сортировка по предрасчитанному рейтингу.
+
+        Рейтинги лежат в отдельной таблице с индексами по каждому
+        из них, поэтому страница выдачи читается по индексу.
+        """
+        field = RANKING_ORDERINGS.get(value)
+        if field is None:
+            raise ValidationError({
+                name: f'Допустимые значения: {", ".join(RANKING_ORDERINGS)}'
+            })
+        return queryset.filter(ranking__isnull=False).order_by(
+            f'-{field}', '-ranking__recipe_id'
+        )
+
 
 class IngredientFilter(FilterSet):
     """Фильтрация ингредиентов."""
 
-    name = filters.CharFilter(lookup_expr='istartswith',)
+    name = filters.CharFilter(method='get_name')
 
     class Meta:
         model = Ingredient
         fields = ('name',)
+
+    def get_name(self, queryset, name, value):
+        """Поиск по названию.
+
+        В PostgreSQL ищет подстроку и похожие слова по триграммному
+        индексу, выводя сначала совпадения с начала названия.
+        В остальных БД ищет по началу названия.
+        """
+        if connections[queryset.db].vendor != 'postgresql':
+            return queryset.filter(name__istartswith=value)
+        return queryset.alias(upper_name=Upper('name')).filter(
+            Q(name__icontains=value)
+            | Q(upper_name__trigram_word_similar=value.upper())
+        ).annotate(
+            is_prefix=Case(
+                When(name__istartswith=value, then=Value(True)),
+                default=Value(False)
+            ),
+            similarity=TrigramWordSimilarity(value, 'name'),
+        ).order_by('-is_prefix', '-similarity', 'name')
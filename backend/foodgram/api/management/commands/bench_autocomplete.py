@@ -0,0 +1,67 @@
+from statistics import mean, quantiles
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.autocomplete import ingredient_index
+from api.filters import IngredientFilter
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    """Сравнение индекса автодополнения с поиском через ORM."""
+
+    help = 'Замеряет поиск ингредиентов по индексу в памяти и через ORM.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queries', type=int, default=500,
+            help='Количество поисковых запросов'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=settings.INGREDIENT_SEARCH_LIMIT,
+            help='Максимальное число результатов'
+        )
+
+    def get_prefixes(self, count):
+        """Собирает префиксы длиной 1-4 символа из названий в БД."""
+        names = Ingredient.objects.values_list('name', flat=True)[:count]
+        return [name[:1 + number % 4] for number, name in enumerate(names)]
+
+    def measure(self, search, prefixes):
+        timings = []
+        for prefix in prefixes:
+            start = perf_counter()
+            search(prefix)
+            timings.append((perf_counter() - start) * 1000)
+        return timings
+
+    def handle(self, *args, **options):
+        prefixes = self.get_prefixes(options['queries'])
+        if not prefixes:
+            raise CommandError('В БД нет ингредиентов, запустите load_data')
+        limit = options['limit']
+
+        def orm_search(prefix):
+            filterset = IngredientFilter(
+                {'name': prefix}, queryset=Ingredient.objects.all()
+            )
+            return list(filterset.qs[:limit])
+
+        def index_search(prefix):
+            return ingredient_index.search(prefix, limit)
+
+        start = perf_counter()
+        ingredient_index.invalidate()
+        index_search('')
+        self.stdout.write(
+            f'Загрузка индекса: {(perf_counter() - start) * 1000:.1f} мс'
+        )
+        for title, search in (('ORM', orm_search), ('Индекс', index_search)):
+            timings = self.measure(search, prefixes)
+            p95 = quantiles(timings, n=20)[-1] if len(timings) > 1 else 0
+            self.stdout.write(
+                f'{title}: {len(timings)} запросов, '
+                f'среднее {mean(timings):.3f} мс, p95 {p95:.3f} мс'
+            )
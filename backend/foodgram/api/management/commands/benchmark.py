@@ -0,0 +1,182 @@
+import json
+from itertools import cycle
+from statistics import median, quantiles
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe
+from users.models import Subscriber, User
+
+ENDPOINTS = {
+    'recipe-list': '/api/recipes/?limit=6',
+    'recipe-list-50': '/api/recipes/?limit=50',
+    'recipe-detail': '/api/recipes/{recipe}/',
+    'recipe-feed': '/api/recipes/feed/?limit=6',
+    'subscriptions': '/api/users/subscriptions/?recipes_limit=3',
+    'shopping-cart': '/api/recipes/download_shopping_cart/',
+    'ingredient-search': '/api/ingredients/?name={prefix}',
+}
+
+
+class Command(BaseCommand):
+    """Нагрузочные замеры основных эндпоинтов API."""
+
+    help = (
+        'Прогоняет основные эндпоинты через тестовый клиент Django и '
+        'выводит число запросов к БД, p50/p95 и пропускную способность. '
+        'Данные можно создать командой generate_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Количество замеряемых запросов к каждому эндпоинту'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Количество запросов для прогрева'
+        )
+        parser.add_argument(
+            '--endpoint', action='append', choices=list(ENDPOINTS),
+            help='Замерять только указанные эндпоинты'
+        )
+        parser.add_argument('--save', help='Сохранить результат в JSON')
+        parser.add_argument(
+            '--baseline', help='Сравнить с ранее сохраненным результатом'
+        )
+        parser.add_argument(
+            '--max-regression', type=float,
+            help='Завершиться ошибкой, если p95 вырос больше чем на '
+                 'столько процентов или выросло число запросов'
+        )
+
+    def get_client(self):
+        """Клиент пользователя с корзиной и наибольшим числом подписок."""
+        top = Subscriber.objects.filter(
+            user__shopping_cart__isnull=False
+        ).values('user').annotate(
+            total=Count('id', distinct=True)
+        ).order_by('-total').first()
+        user = (
+            User.objects.get(pk=top['user']) if top
+            else User.objects.order_by('id').first()
+        )
+        if user is None:
+            raise CommandError('В БД нет пользователей, запустите '
+                               'generate_data')
+        token, _ = Token.objects.get_or_create(user=user)
+        return Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def get_urls(self, template, count):
+        recipes = list(
+            Recipe.objects.order_by('-favorites_count', '-id')
+            .values_list('id', flat=True)[:count]
+        ) or [0]
+        prefixes = [
+            name[:1 + number % 3] for number, name in enumerate(
+                Ingredient.objects.values_list('name', flat=True)[:count]
+            )
+        ] or ['а']
+        return cycle([
+            template.format(
+                recipe=recipes[number % len(recipes)],
+                prefix=prefixes[number % len(prefixes)]
+            )
+            for number in range(count)
+        ])
+
+    def request(self, client, url):
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code
+
+    def measure(self, client, template, requests, warmup):
+        urls = self.get_urls(template, requests)
+        for _ in range(warmup):
+            self.request(client, next(urls))
+        timings = []
+        queries = []
+        statuses = set()
+        for _ in range(requests):
+            url = next(urls)
+            with CaptureQueriesContext(connection) as context:
+                start = perf_counter()
+                statuses.add(self.request(client, url))
+                timings.append((perf_counter() - start) * 1000)
+            queries.append(len(context))
+        p95 = quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        return {
+            'queries': max(queries),
+            'p50_ms': round(median(timings), 3),
+            'p95_ms': round(p95, 3),
+            'rps': round(len(timings) / (sum(timings) / 1000), 1),
+            'status': sorted(statuses),
+        }
+
+    def compare(self, result, baseline):
+        """Возвращает отличие от базового замера и признак регрессии."""
+        if baseline is None:
+            return '', 0, 0
+        p95 = (result['p95_ms'] / max(baseline['p95_ms'], 1e-3) - 1) * 100
+        queries = result['queries'] - baseline['queries']
+        return f'  p95 {p95:+.1f}%, запросов {queries:+d}', p95, queries
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['warmup'] < 0:
+            raise CommandError('Некорректное число запросов')
+        baseline = {}
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='UTF-8') as file:
+                    baseline = json.load(file)['endpoints']
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError(
+                    f'Не удалось прочитать {options["baseline"]}: {error}'
+                )
+        names = options['endpoint'] or list(ENDPOINTS)
+        results = {}
+        regressions = []
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            client = self.get_client()
+            self.stdout.write(
+                f'{"эндпоинт":<20}{"запросов":>9}{"p50, мс":>10}'
+                f'{"p95, мс":>10}{"запр./с":>10}'
+            )
+            for name in names:
+                result = self.measure(
+                    client, ENDPOINTS[name],
+                    options['requests'], options['warmup']
+                )
+                results[name] = result
+                diff, p95, queries = self.compare(result, baseline.get(name))
+                limit = options['max_regression']
+                if limit is not None and (p95 > limit or queries > 0):
+                    regressions.append(name)
+                self.stdout.write(
+                    f'{name:<20}{result["queries"]:>9}'
+                    f'{result["p50_ms"]:>10.2f}{result["p95_ms"]:>10.2f}'
+                    f'{result["rps"]:>10.1f}{diff}'
+                )
+                if result['status'] != [200]:
+                    self.stdout.write(self.style.WARNING(
+                        f'  коды ответа: {result["status"]}'
+                    ))
+        if options['save']:
+            with open(options['save'], 'w', encoding='UTF-8') as file:
+                json.dump(
+                    {
+                        'database': connection.vendor,
+                        'requests': options['requests'],
+                        'endpoints': results,
+                    },
+                    file, ensure_ascii=False, indent=2
+                )
+        if regressions:
+            raise CommandError(f'Регрессия: {", ".join(regressions)}')
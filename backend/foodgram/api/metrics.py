@@ -0,0 +1,263 @@
+"""Замеры запросов к БД и времени ответов."""
+
+import re
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# Верхние границы корзин гистограммы времени ответа, мс.
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def fingerprint(sql):
+    """Приводит запрос к виду, не зависящему от длины списков IN."""
+    return IN_LIST.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    """Обертка выполнения запросов, считающая их число и время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+
+class Histogram:
+    """Гистограмма значений в миллисекундах."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """Оценка перцентиля сверху по границе корзины."""
+        rank = fraction * self.total
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class EndpointStats:
+    """Накопленные замеры одного обработчика."""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.queries = 0
+        self.max_queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+
+    def as_dict(self, endpoint):
+        requests = self.latency.total
+        return {
+            'endpoint': endpoint,
+            'requests': requests,
+            'p50_ms': round(self.latency.percentile(0.5), 2),
+            'p95_ms': round(self.latency.percentile(0.95), 2),
+            'max_ms': round(self.latency.max, 2),
+            'total_ms': round(self.latency.sum, 2),
+            'avg_queries': round(self.queries / requests, 2),
+            'max_queries': self.max_queries,
+            'avg_db_ms': round(self.db / requests, 2),
+            'avg_serialize_ms': round(self.serialize / requests, 2),
+            'avg_render_ms': round(self.render / requests, 2),
+        }
+
+
+class Metrics:
+    """Замеры API, накопленные в памяти процесса."""
+
+    SORT_KEYS = {
+        'p95': 'p95_ms',
+        'total': 'total_ms',
+        'queries': 'avg_queries',
+    }
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        """Сбрасывает все замеры."""
+        with self._lock:
+            self._endpoints = {}
+            self._repeated = {}
+
+    def record(self, endpoint, wall, serialize, render, recorder):
+        """Учитывает один ответ; время передается в секундах."""
+        threshold = settings.API_METRICS_REPEAT_THRESHOLD
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, EndpointStats())
+            stats.latency.add(wall * 1000)
+            stats.queries += recorder.count
+            stats.max_queries = max(stats.max_queries, recorder.count)
+            stats.db += recorder.duration * 1000
+            stats.serialize += serialize * 1000
+            stats.render += render * 1000
+            for sql, repeats in recorder.fingerprints.items():
+                if repeats < threshold:
+                    continue
+                repeated = self._repeated.setdefault(
+                    (endpoint, sql), {'requests': 0, 'max_repeats': 0}
+                )
+                repeated['requests'] += 1
+                repeated['max_repeats'] = max(
+                    repeated['max_repeats'], repeats
+                )
+
+    def snapshot(self, limit, sort='p95'):
+        """Возвращает limit самых медленных обработчиков и повторы SQL."""
+        with self._lock:
+            endpoints = [
+                stats.as_dict(endpoint)
+                for endpoint, stats in self._endpoints.items()
+            ]
+            repeated = [
+                {'endpoint': endpoint, 'sql': sql, **counts}
+                for (endpoint, sql), counts in self._repeated.items()
+            ]
+        endpoints.sort(key=lambda item: item[self.SORT_KEYS[sort]],
+                       reverse=True)
+        repeated.sort(key=lambda item: item['max_repeats'], reverse=True)
+        return {
+            'endpoints': endpoints[:limit],
+            'repeated_queries': repeated[:limit],
+        }
+
+
+metrics = Metrics()
+
+
+class SerializationTimingMixin:
+    """Замеряет время to_representation сериализаторов обработчика.
+
+    Запросы в цикле при ленивой загрузке связей выполняются именно
+    здесь, поэтому время сериализации учитывается отдельно от
+    рендеринга JSON. Учитываются сериализаторы из get_serializer.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if not settings.API_METRICS:
+            return serializer
+        request = self.request._request
+        to_representation = serializer.to_representation
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return to_representation(*args, **kwargs)
+            finally:
+                request._metrics_serialize = getattr(
+                    request, '_metrics_serialize', 0.0
+                ) + perf_counter() - start
+
+        serializer.to_representation = timed
+        return serializer
+
+
+@contextmanager
+def record_queries(recorder):
+    """Передает recorder все запросы ко всем подключениям к БД."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield
+
+
+class QueryMetricsMiddleware:
+    """Замеряет запросы к БД, сериализацию, рендеринг и время ответа.
+
+    Включается настройкой API_METRICS. Результат отдается
+    в заголовке Server-Timing и накапливается в metrics.
+    Потоковые ответы учитываются в metrics после отдачи тела,
+    а заголовок содержит только запросы до начала отдачи.
+    """
+
+    def __init__(self, get_response):
+        if not settings.API_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = perf_counter()
+        with record_queries(recorder):
+            response = self.get_response(request)
+        wall = perf_counter() - start
+        serialize = getattr(request, '_metrics_serialize', 0.0)
+        render = getattr(request, '_metrics_render', 0.0)
+        description = f'{recorder.count} queries'
+        if response.streaming:
+            description += ' before streaming'
+        response['Server-Timing'] = (
+            f'db;dur={recorder.duration * 1000:.2f};'
+            f'desc="{description}", '
+            f'serialize;dur={serialize * 1000:.2f}, '
+            f'render;dur={render * 1000:.2f}, '
+            f'total;dur={wall * 1000:.2f}'
+        )
+        if response.streaming:
+            response.streaming_content = self.stream(
+                request, response.streaming_content, recorder, start,
+                serialize, render
+            )
+        else:
+            self.record(request, wall, serialize, render, recorder)
+        return response
+
+    def stream(self, request, content, recorder, start, serialize, render):
+        """Отдает тело ответа, продолжая считать запросы к БД."""
+        try:
+            with record_queries(recorder):
+                yield from content
+        finally:
+            self.record(
+                request, perf_counter() - start, serialize, render, recorder
+            )
+
+    def record(self, request, wall, serialize, render, recorder):
+        match = request.resolver_match
+        if match is not None:
+            metrics.record(
+                f'{request.method} {match.view_name}', wall, serialize,
+                render, recorder
+            )
+
+    def process_template_response(self, request, response):
+        start = perf_counter()
+
+        def rendered(response):
+            request._metrics_render = perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
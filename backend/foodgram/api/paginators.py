@@ -1,8 +1,82 @@
-from rest_framework.pagination import PageNumberPagination
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор с кэшируемым количеством объектов.
+
+    Количество кэшируется на PAGINATION_COUNT_CACHE_TTL секунд
+    отдельно для каждого SQL-запроса. Для запросов без условий
+    к таблицам PostgreSQL больше PAGINATION_COUNT_ESTIMATE_THRESHOLD
+    строк берется оценка reltuples из статистики планировщика.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        estimate = self.get_estimate(queryset)
+        if estimate is not None:
+            return estimate
+        ttl = settings.PAGINATION_COUNT_CACHE_TTL
+        if not ttl:
+            return super().count
+        sql, params = queryset.query.sql_with_params()
+        key = 'count:{}'.format(
+            md5(f'{queryset.db}:{sql}:{params!r}'.encode()).hexdigest()
+        )
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, ttl)
+        return count
+
+    def get_estimate(self, queryset):
+        threshold = settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+        connection = connections[queryset.db]
+        if (
+            not threshold
+            or connection.vendor != 'postgresql'
+            or queryset.query.where
+            or queryset.query.distinct
+        ):
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < threshold:
+            return None
+        return row[0]
 
 
 class LimitPageNumberPaginator(PageNumberPagination):
     """Настройки пагинатора."""
 
+    django_paginator_class = CachedCountPaginator
+    page_size = 6
+    page_size_query_param = 'limit'
+
+
+class LimitCursorPaginator(CursorPagination):
+    """Постраничный вывод по курсору.
+
+    Страница выбирается условием по id вместо OFFSET, количество
+    объектов не считается, а вставка новых записей не сдвигает
+    уже просмотренные страницы.
+    """
+
     page_size = 6
     page_size_query_param = 'limit'
+    ordering = '-id'
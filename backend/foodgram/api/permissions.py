@@ -5,7 +5,7 @@ class IsAuthorOrAdminOrReadOnly(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         return (
-            obj.author == request.user
+            obj.author_id == request.user.pk
             or request.method in SAFE_METHODS
             or request.user.is_authenticated
             and request.user.is_superuser
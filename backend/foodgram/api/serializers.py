@@ -5,13 +5,22 @@ from django.core.validators import (
     RegexValidator
 )
 from django.db import transaction
+from django.urls import reverse
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
-from .fields import Base64ImageField
+from .fields import Base64ImageField, BulkManyRelatedField
+from recipes.counters import change_counter
+from recipes.images import schedule_recipe_image
 from recipes.models import (
-    Ingredient, Recipe, RecipeIngredient, ShortLink, Tag
+    MAX_AMOUNT,
+    MIN_AMOUNT,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShortLink,
+    Tag
 )
 from users.models import User
 
@@ -43,6 +52,8 @@ class CustomUserSerializer(UserSerializer):
                   'last_name', 'is_subscribed', 'avatar')
 
     def get_is_subscribed(self, object):
+        if hasattr(object, 'is_subscribed'):
+            return object.is_subscribed
         request = self.context['request']
         if request.user.is_anonymous:
             return False
@@ -114,17 +125,20 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
     """Вывод короткой информации о рецепте."""
 
     image = Base64ImageField(required=True)
+    thumbnail = serializers.ImageField(read_only=True)
+    image_webp = serializers.ImageField(read_only=True)
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = (
+            'id', 'name', 'image', 'thumbnail', 'image_webp', 'cooking_time'
+        )
 
 
 class SubscriptionSerializer(CustomUserSerializer):
     """Получение подписок пользователя."""
 
     recipes = serializers.SerializerMethodField(read_only=True)
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -132,16 +146,68 @@ class SubscriptionSerializer(CustomUserSerializer):
                   'is_subscribed', 'recipes', 'recipes_count', 'avatar')
 
     def get_recipes(self, object):
-        request = self.context['request']
-        limit = request.GET.get('recipes_limit')
-        recipes = Recipe.objects.filter(author=object)
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(object, 'limited_recipes'):
+            recipes = object.limited_recipes
+        else:
+            recipes = object.recipes.all()
+            limit = self.context.get('recipes_limit')
+            if limit is not None:
+                recipes = recipes[:limit]
         serializer = ShortRecipeSerializer(recipes, many=True)
         return serializer.data
 
-    def get_recipes_count(self, object):
-        return object.recipes.count()
+
+class IngredientSearchSerializer(serializers.Serializer):
+    """Проверка параметра limit при поиске ингредиентов."""
+
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.INGREDIENT_SEARCH_MAX_LIMIT,
+        default=settings.INGREDIENT_SEARCH_LIMIT
+    )
+
+
+class RecipesLimitSerializer(serializers.Serializer):
+    """Проверка параметра recipes_limit."""
+
+    recipes_limit = serializers.IntegerField(min_value=0, required=False)
+
+
+class MetricsSerializer(serializers.Serializer):
+    """Проверка параметров отчета о замерах API."""
+
+    limit = serializers.IntegerField(
+        min_value=1, default=settings.API_METRICS_TOP
+    )
+    sort = serializers.ChoiceField(
+        choices=('p95', 'total', 'queries'), default='p95'
+    )
+
+
+class BulkRecipesSerializer(serializers.Serializer):
+    """Списки рецептов для пакетного добавления и удаления."""
+
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), default=list,
+        max_length=settings.BULK_RECIPES_MAX_SIZE
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), default=list,
+        max_length=settings.BULK_RECIPES_MAX_SIZE
+    )
+
+    def validate(self, data):
+        if not data['add'] and not data['remove']:
+            raise serializers.ValidationError(
+                'Передайте рецепты в add или remove'
+            )
+        both = set(data['add']) & set(data['remove'])
+        if both:
+            raise serializers.ValidationError(
+                f'Рецепты одновременно в add и remove: {sorted(both)}'
+            )
+        data['add'] = list(dict.fromkeys(data['add']))
+        data['remove'] = list(dict.fromkeys(data['remove']))
+        return data
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
@@ -169,53 +235,75 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    thumbnail = serializers.ImageField(read_only=True)
+    image_webp = serializers.ImageField(read_only=True)
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+            'is_in_shopping_cart', 'name', 'image', 'thumbnail',
+            'image_webp', 'text', 'cooking_time'
         )
         read_only_fields = ('author', 'tags', 'ingredients')
 
     def get_is_favorited(self, object):
+        if hasattr(object, 'is_favorited'):
+            return object.is_favorited
         request = self.context['request']
         if request.user.is_anonymous:
             return False
         return object.favorite.filter(user=request.user).exists()
 
     def get_is_in_shopping_cart(self, object):
+        if hasattr(object, 'is_in_shopping_cart'):
+            return object.is_in_shopping_cart
         request = self.context['request']
         if request.user.is_anonymous:
             return False
         return object.shopping_cart.filter(user=request.user).exists()
 
 
+class IngredientListSerializer(serializers.ListSerializer):
+    """Список ингредиентов рецепта.
+
+    Ингредиенты всех элементов загружаются одним запросом.
+    """
+
+    def validate(self, attrs):
+        ids = [item['id'] for item in attrs]
+        ingredients = Ingredient.objects.in_bulk(set(ids))
+        missing = [pk for pk in dict.fromkeys(ids) if pk not in ingredients]
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиенты не найдены: {", ".join(map(str, missing))}'
+            )
+        for item in attrs:
+            item['id'] = ingredients[item['id']]
+        return attrs
+
+
 class IngredientCreateSerializer(serializers.ModelSerializer):
     """Проверка ингредиента при создании рецепта."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
+    id = serializers.IntegerField()
+    amount = serializers.IntegerField(
+        write_only=True, min_value=MIN_AMOUNT, max_value=MAX_AMOUNT
     )
-    amount = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
-
-    def validate_amout(self, value):
-        if value <= 0:
-            raise serializers.ValidationError(
-                'Количество должно быть больше 0'
-            )
-        return value
+        list_serializer_class = IngredientListSerializer
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Создание и обновление рецептов."""
 
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all()
+    tags = BulkManyRelatedField(
+        child_relation=serializers.PrimaryKeyRelatedField(
+            queryset=Tag.objects.all()
+        )
     )
     ingredients = IngredientCreateSerializer(
         write_only=True, many=True
@@ -234,8 +322,11 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         )
 
     def validate(self, data):
+        ingredients = data.get('ingredients')
+        if ingredients is None:
+            return data
         ingredienеts_list = [
-            ingredient.get('id') for ingredient in data.get('ingredients')
+            ingredient.get('id') for ingredient in ingredients
         ]
         if len(ingredienеts_list) == len(set(ingredienеts_list)):
             return data
@@ -252,29 +343,78 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                     ingredient=ingredient['id']
                 )
             )
-        RecipeIngredient.objects.bulk_create(ingredients_list)
+        if ingredients_list:
+            RecipeIngredient.objects.bulk_create(ingredients_list)
+
+    def update_ingredients(self, ingredients, recipe):
+        """Приводит ингредиенты рецепта к переданным.
+
+        Меняются только отличающиеся строки: одним bulk_update
+        количества, одним DELETE удаленные и одним INSERT новые.
+        """
+        amounts = {
+            ingredient['id'].pk: ingredient['amount']
+            for ingredient in ingredients
+        }
+        current = {
+            item.ingredient_id: item
+            for item in RecipeIngredient.objects.filter(
+                recipe=recipe
+            ).order_by()
+        }
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != item.amount:
+                item.amount = amount
+                changed.append(item)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        removed = [
+            item.pk for ingredient_id, item in current.items()
+            if ingredient_id not in amounts
+        ]
+        if removed:
+            RecipeIngredient.objects.filter(pk__in=removed).delete()
+        self.create_ingredients(
+            [
+                ingredient for ingredient in ingredients
+                if ingredient['id'].pk not in current
+            ],
+            recipe
+        )
 
     @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
+        change_counter(User, 'recipes_count', [recipe.author_id], 1)
         recipe.tags.set(tags)
         self.create_ingredients(ingredients, recipe)
+        schedule_recipe_image(recipe)
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
-        instance.ingredients.clear()
-        self.create_ingredients(ingredients, instance)
-        instance.tags.clear()
-        instance.tags.set(tags)
-        return super().update(instance, validated_data)
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        if ingredients is not None:
+            self.update_ingredients(ingredients, instance)
+        if tags is not None:
+            instance.tags.set(tags)
+        if 'image' in validated_data:
+            validated_data.update(thumbnail=None, image_webp=None)
+        instance = super().update(instance, validated_data)
+        if 'image' in validated_data:
+            schedule_recipe_image(instance)
+        return instance
 
     def to_representation(self, instance):
         request = self.context['request']
+        instance = Recipe.objects.with_details(request.user).get(
+            pk=instance.pk
+        )
         serializer = RecipeGetSerializer(
             instance, context={'request': request}
         )
@@ -291,4 +431,9 @@ class ShortLinkSerializer(serializers.ModelSerializer):
         fields = ('short_link',)
 
     def to_representation(self, value):
-        return {'short-link': value.surl}
+        request = self.context['request']
+        return {
+            'short-link': request.build_absolute_uri(
+                reverse('short-link', args=[value.surl])
+            )
+        }
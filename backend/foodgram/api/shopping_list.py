@@ -0,0 +1,157 @@
+"""Выгрузка списка покупок в разных форматах."""
+
+import csv
+import logging
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.db.models import Sum
+
+from recipes.models import RecipeIngredient, ShoppingCart
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFError, TTFont
+    from reportlab.pdfgen.canvas import Canvas
+except ImportError:
+    Canvas = None
+
+CHUNK_SIZE = 64 * 1024
+PDF_FONT = 'ShoppingListFont'
+
+logger = logging.getLogger(__name__)
+
+
+def get_shopping_list(user):
+    """Возвращает итератор по ингредиентам из корзины пользователя.
+
+    Суммирование выполняется в БД, строки читаются порциями.
+    """
+    return RecipeIngredient.objects.filter(
+        recipe__in=ShoppingCart.objects.filter(user=user).values('recipe_id')
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(
+        quantity=Sum('amount')
+    ).order_by('ingredient__name').iterator()
+
+
+def count_shopping_list(user):
+    """Возвращает число строк списка покупок пользователя."""
+    return RecipeIngredient.objects.filter(
+        recipe__in=ShoppingCart.objects.filter(user=user).values('recipe_id')
+    ).values('ingredient').distinct().count()
+
+
+class Echo:
+    """Объект с методом write, возвращающий записанное значение."""
+
+    def write(self, value):
+        return value
+
+
+class TextRenderer:
+    """Список покупок в виде текстового файла."""
+
+    content_type = 'text/plain; charset=utf-8'
+    extension = 'txt'
+    max_rows = None
+
+    def render(self, items):
+        yield 'Необходимо купить:\n'
+        for item in items:
+            yield (
+                f'{item["ingredient__name"]} - {item["quantity"]}'
+                f'{item["ingredient__measurement_unit"]}.\n'
+            )
+
+
+class CSVRenderer:
+    """Список покупок в формате CSV."""
+
+    content_type = 'text/csv; charset=utf-8'
+    extension = 'csv'
+    max_rows = None
+
+    def render(self, items):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('Ингредиент', 'Количество', 'Ед. измерения'))
+        for item in items:
+            yield writer.writerow((
+                item['ingredient__name'],
+                item['quantity'],
+                item['ingredient__measurement_unit'],
+            ))
+
+
+class PDFRenderer:
+    """Список покупок в формате PDF.
+
+    Canvas хранит все страницы в памяти до вызова save(), поэтому
+    документ целиком собирается до отправки первого байта.
+    Готовый файл записывается во временный файл, который остается
+    в памяти до spool_size байт, и отдается частями. Размер списка
+    ограничен max_rows строками.
+    """
+
+    content_type = 'application/pdf'
+    extension = 'pdf'
+    font_size = 12
+    margin = 50
+    spool_size = 1024 * 1024
+    max_rows = settings.SHOPPING_LIST_PDF_MAX_ROWS
+
+    def render(self, items):
+        font = PDF_FONT
+        with SpooledTemporaryFile(max_size=self.spool_size) as file:
+            canvas = Canvas(file, pagesize=A4)
+            _, height = A4
+            line_height = self.font_size * 1.5
+            canvas.setFont(font, self.font_size + 4)
+            y = height - self.margin
+            canvas.drawString(self.margin, y, 'Необходимо купить:')
+            y -= line_height * 2
+            canvas.setFont(font, self.font_size)
+            for item in items:
+                if y < self.margin:
+                    canvas.showPage()
+                    canvas.setFont(font, self.font_size)
+                    y = height - self.margin
+                canvas.drawString(
+                    self.margin, y,
+                    f'{item["ingredient__name"]} - {item["quantity"]}'
+                    f'{item["ingredient__measurement_unit"]}.'
+                )
+                y -= line_height
+            canvas.save()
+            file.seek(0)
+            while chunk := file.read(CHUNK_SIZE):
+                yield chunk
+
+
+def register_pdf_font():
+    """Подключает шрифт с поддержкой кириллицы из настроек.
+
+    Встроенные шрифты PDF не содержат кириллицы, поэтому без
+    него выгрузка в PDF отключается.
+    """
+    try:
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT, settings.SHOPPING_LIST_PDF_FONT)
+        )
+    except (OSError, TTFError):
+        logger.exception(
+            'Не удалось подключить шрифт %s, выгрузка в PDF отключена',
+            settings.SHOPPING_LIST_PDF_FONT
+        )
+        return False
+    return True
+
+
+RENDERERS = {
+    TextRenderer.extension: TextRenderer,
+    CSVRenderer.extension: CSVRenderer,
+}
+if Canvas is not None and register_pdf_font():
+    RENDERERS[PDFRenderer.extension] = PDFRenderer
@@ -0,0 +1,185 @@
+"""Короткие ссылки на рецепты."""
+
+import atexit
+import logging
+from collections import Counter, OrderedDict
+from string import ascii_letters, digits
+from threading import Lock, Timer
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.models import Case, F, Value, When
+from django.http import Http404
+
+from recipes.models import ShortLink
+
+logger = logging.getLogger(__name__)
+
+ALPHABET = digits + ascii_letters
+BASE = len(ALPHABET)
+CACHE_KEY = 'short-link:{}'
+
+
+def encode(number):
+    """Кодирует число в base62.
+
+    Коды новых ссылок выводятся из id рецепта, поэтому не совпадают
+    друг с другом; со старыми случайными семибуквенными кодами они
+    не пересекаются, пока id меньше 62 ** 6.
+    """
+    code = ''
+    while True:
+        number, remainder = divmod(number, BASE)
+        code = ALPHABET[remainder] + code
+        if not number:
+            return code
+
+
+def get_short_link(recipe):
+    """Возвращает короткую ссылку рецепта, создавая ее при необходимости."""
+    link, _ = ShortLink.objects.get_or_create(
+        recipe=recipe,
+        defaults={
+            'surl': encode(recipe.pk),
+            'lurl': recipe.get_absolute_url()
+        }
+    )
+    return link
+
+
+class LinkCache:
+    """Ограниченный LRU-кэш адресов в памяти процесса.
+
+    В отличие от functools.lru_cache позволяет убрать один код,
+    не сбрасывая остальные.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._urls = OrderedDict()
+
+    def get(self, code):
+        with self._lock:
+            url = self._urls.get(code)
+            if url is not None:
+                self._urls.move_to_end(code)
+            return url
+
+    def set(self, code, url):
+        with self._lock:
+            self._urls[code] = url
+            self._urls.move_to_end(code)
+            while len(self._urls) > settings.SHORT_LINK_CACHE_SIZE:
+                self._urls.popitem(last=False)
+
+    def delete(self, code):
+        with self._lock:
+            self._urls.pop(code, None)
+
+
+local_cache = LinkCache()
+
+
+def resolve(code):
+    """Возвращает адрес рецепта на сайте по коду короткой ссылки.
+
+    Перед БД стоят два уровня кэша: LRU в памяти процесса и общий
+    кэш Django, чтобы новые процессы не шли в БД за популярными
+    ссылками. Неизвестные коды не кэшируются.
+    """
+    url = local_cache.get(code)
+    if url is not None:
+        return url
+    key = CACHE_KEY.format(code)
+    url = cache.get(key)
+    if url is None:
+        try:
+            lurl = ShortLink.objects.values_list('lurl', flat=True).get(
+                surl=code
+            )
+        except ShortLink.DoesNotExist:
+            raise Http404
+        url = lurl.replace('/api', '', 1)[:-1]
+        cache.set(key, url, settings.SHORT_LINK_CACHE_TIMEOUT)
+    local_cache.set(code, url)
+    return url
+
+
+def invalidate(code):
+    """Убирает код из обоих уровней кэша."""
+    local_cache.delete(code)
+    cache.delete(CACHE_KEY.format(code))
+
+
+class HitCounter:
+    """Счетчик переходов по коротким ссылкам.
+
+    Переходы копятся в памяти и записываются в БД одним UPDATE,
+    когда их набирается SHORT_LINK_HITS_FLUSH_SIZE, а остальные -
+    фоновым таймером через SHORT_LINK_HITS_FLUSH_INTERVAL секунд
+    после первого незаписанного перехода и при завершении процесса.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._hits = Counter()
+        self._pending = 0
+        self._timer = None
+        atexit.register(self.flush)
+
+    def add(self, code):
+        """Учитывает переход по ссылке."""
+        with self._lock:
+            self._hits[code] += 1
+            self._pending += 1
+            due = self._pending >= settings.SHORT_LINK_HITS_FLUSH_SIZE
+            if not due:
+                self._schedule()
+        if due:
+            self.flush()
+
+    def _schedule(self):
+        """Запускает таймер записи, если он еще не запущен."""
+        if self._timer is None:
+            self._timer = Timer(
+                settings.SHORT_LINK_HITS_FLUSH_INTERVAL, self._flush_in_thread
+            )
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+    def flush(self):
+        """Записывает накопленные переходы в БД."""
+        with self._lock:
+            hits, self._hits = self._hits, Counter()
+            self._pending = 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not hits:
+            return
+        try:
+            ShortLink.objects.filter(surl__in=hits).update(
+                hits=F('hits') + Case(
+                    *(
+                        When(surl=code, then=Value(count))
+                        for code, count in hits.items()
+                    ),
+                    default=Value(0)
+                )
+            )
+        except DatabaseError:
+            logger.exception('Не удалось сохранить переходы по ссылкам')
+            with self._lock:
+                self._hits.update(hits)
+                self._pending += hits.total()
+                self._schedule()
+
+
+hit_counter = HitCounter()
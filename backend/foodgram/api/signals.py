@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import ingredient_index
+from .cache import bump_version
+from .feed import invalidate_feed
+from .shortlinks import invalidate
+from recipes.models import Ingredient, ShortLink, Tag
+from users.models import Subscriber
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients(sender, **kwargs):
+    """Сбрасывает индекс автодополнения и кэш ингредиентов."""
+    ingredient_index.invalidate()
+    bump_version('ingredients')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    """Сбрасывает кэш тэгов."""
+    bump_version('tags')
+
+
+@receiver(post_delete, sender=ShortLink)
+def invalidate_short_link(sender, instance, **kwargs):
+    """Сбрасывает кэш удаленной короткой ссылки."""
+    invalidate(instance.surl)
+
+
+@receiver((post_save, post_delete), sender=Subscriber)
+def invalidate_subscriber_feed(sender, instance, **kwargs):
+    """Сбрасывает ленту подписчика при изменении подписок."""
+    invalidate_feed(instance.user_id)
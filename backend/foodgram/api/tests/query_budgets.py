@@ -0,0 +1,91 @@
+"""Бюджеты запросов к БД для эндпоинтов API.
+
+Проверяются тестами из test_query_budgets на тестовых данных.
+Бюджет - максимальное число запросов без учета управления
+транзакциями. После оптимизации бюджет нужно уменьшить, чтобы
+закрепить результат.
+"""
+
+from collections import namedtuple
+
+PAGE_SIZES = (1, 6, 50)
+
+Budget = namedtuple('Budget', ('name', 'method', 'url', 'queries', 'data'))
+Budget.__new__.__defaults__ = (None,)
+
+# В адресе доступны подстановки {limit} (размер страницы), {recipe},
+# {own_recipe}, {favorite}, {in_cart}, {author}, {followed},
+# {ingredient}, {tag}, {tag_slug}, {user} и {me}. Для адресов с {limit}
+# бюджет задается словарем по размерам страниц из PAGE_SIZES.
+# data - имя тела запроса из QueryBudgetTest.bodies.
+BUDGETS = (
+    Budget('recipes-list', 'get', '/api/recipes/?limit={limit}',
+           {1: 6, 6: 6, 50: 6}),
+    Budget('recipes-list-cursor', 'get',
+           '/api/recipes/?pagination=cursor&limit={limit}',
+           {1: 5, 6: 5, 50: 5}),
+    Budget('recipes-list-filtered', 'get',
+           '/api/recipes/?is_favorited=1&tags={tag_slug}&limit={limit}',
+           {1: 7, 6: 7, 50: 7}),
+    Budget('recipes-list-popular', 'get',
+           '/api/recipes/?ordering=popular&limit={limit}',
+           {1: 6, 6: 6, 50: 6}),
+    Budget('recipes-feed', 'get', '/api/recipes/feed/?limit={limit}',
+           {1: 6, 6: 6, 50: 6}),
+    Budget('recipes-retrieve', 'get', '/api/recipes/{recipe}/', 5),
+    Budget('recipes-create', 'post', '/api/recipes/', 13, 'recipe'),
+    Budget('recipes-update', 'put', '/api/recipes/{own_recipe}/', 13,
+           'recipe'),
+    Budget('recipes-partial-update', 'patch', '/api/recipes/{own_recipe}/',
+           13, 'recipe'),
+    Budget('recipes-destroy', 'delete', '/api/recipes/{own_recipe}/', 10),
+    Budget('recipes-favorite-add', 'post',
+           '/api/recipes/{recipe}/favorite/', 5),
+    Budget('recipes-favorite-remove', 'delete',
+           '/api/recipes/{favorite}/favorite/', 4),
+    Budget('recipes-shopping-cart-add', 'post',
+           '/api/recipes/{recipe}/shopping_cart/', 5),
+    Budget('recipes-shopping-cart-remove', 'delete',
+           '/api/recipes/{in_cart}/shopping_cart/', 4),
+    Budget('recipes-favorite-bulk', 'post', '/api/recipes/favorite/bulk/',
+           6, 'bulk'),
+    Budget('recipes-shopping-cart-bulk', 'post',
+           '/api/recipes/shopping_cart/bulk/', 6, 'bulk'),
+    Budget('recipes-download-shopping-cart', 'get',
+           '/api/recipes/download_shopping_cart/', 3),
+    Budget('recipes-download-shopping-cart-csv', 'get',
+           '/api/recipes/download_shopping_cart/?format=csv', 3),
+    Budget('recipes-download-shopping-cart-pdf', 'get',
+           '/api/recipes/download_shopping_cart/?format=pdf', 4),
+    Budget('users-list', 'get', '/api/users/?limit={limit}',
+           {1: 3, 6: 3, 50: 3}),
+    Budget('users-retrieve', 'get', '/api/users/{user}/', 2),
+    Budget('users-create', 'post', '/api/users/', 4, 'new_user'),
+    Budget('users-update', 'put', '/api/users/{me}/', 6, 'new_user'),
+    Budget('users-partial-update', 'patch', '/api/users/{me}/', 4,
+           'profile'),
+    Budget('users-destroy', 'delete', '/api/users/{me}/', 22),
+    Budget('users-me', 'get', '/api/users/me/', 2),
+    Budget('users-set-password', 'post', '/api/users/set_password/', 3,
+           'password'),
+    Budget('users-avatar-update', 'put', '/api/users/me/avatar/', 3,
+           'avatar'),
+    Budget('users-avatar-delete', 'delete', '/api/users/me/avatar/', 3),
+    Budget('users-subscriptions', 'get',
+           '/api/users/subscriptions/?limit={limit}',
+           {1: 4, 6: 4, 50: 4}),
+    Budget('users-subscriptions-limited', 'get',
+           '/api/users/subscriptions/?recipes_limit=3&limit={limit}',
+           {1: 4, 6: 4, 50: 4}),
+    Budget('users-subscribe', 'post',
+           '/api/users/{author}/subscribe/?recipes_limit=3', 6),
+    Budget('users-unsubscribe', 'delete',
+           '/api/users/{followed}/subscribe/', 5),
+    Budget('tags-list', 'get', '/api/tags/', 2),
+    Budget('tags-retrieve', 'get', '/api/tags/{tag}/', 2),
+    Budget('ingredients-list', 'get', '/api/ingredients/', 2),
+    Budget('ingredients-search', 'get',
+           '/api/ingredients/?name=а&limit={limit}', {1: 2, 6: 2, 50: 2}),
+    Budget('ingredients-retrieve', 'get',
+           '/api/ingredients/{ingredient}/', 2),
+)
@@ -0,0 +1,102 @@
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+MARKS = 200
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CounterTest(TestCase):
+    """Счетчики меняются явно, а каскадное удаление не идет по строкам."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.user = User.objects.bulk_create(
+            User(username=name, email=f'{name}@example.com')
+            for name in ('author', 'user')
+        )
+        cls.others = User.objects.bulk_create(
+            User(username=f'user{number}', email=f'user{number}@example.com')
+            for number in range(MARKS)
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Текст', cooking_time=10
+        )
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                model(user=other, recipe=cls.recipe) for other in cls.others
+            )
+        Recipe.objects.filter(pk=cls.recipe.pk).update(
+            favorites_count=MARKS, in_carts_count=MARKS
+        )
+        User.objects.filter(pk=cls.author.pk).update(recipes_count=1)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}'
+        )
+        return client
+
+    def assertCounters(self, favorites, carts):
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, favorites)
+        self.assertEqual(self.recipe.in_carts_count, carts)
+
+    def test_recipe_delete_does_not_scale_with_marks(self):
+        client = self.client_for(self.author)
+        with self.assertNumQueries(12):
+            response = client.delete(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Favorite.objects.exists())
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 0)
+
+    def test_favorite_and_cart(self):
+        client = self.client_for(self.user)
+        for url in ('favorite', 'shopping_cart'):
+            response = client.post(f'/api/recipes/{self.recipe.pk}/{url}/')
+            self.assertEqual(response.status_code, 201)
+        self.assertCounters(MARKS + 1, MARKS + 1)
+        response = client.delete(f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertEqual(response.status_code, 204)
+        response = client.delete(f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertEqual(response.status_code, 400)
+        self.assertCounters(MARKS, MARKS + 1)
+
+    def test_user_delete_recounts_marked_recipes(self):
+        self.others[0].delete()
+        self.assertCounters(MARKS - 1, MARKS - 1)
+
+    def test_recipe_create(self):
+        client = self.client_for(self.user)
+        tag = self.recipe.tags.model.objects.create(name='Тэг', slug='tag')
+        ingredient = self.recipe.ingredients.model.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        response = client.post('/api/recipes/', {
+            'ingredients': [{'id': ingredient.pk, 'amount': 1}],
+            'tags': [tag.pk],
+            'image': (
+                'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAA'
+                'AAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+            ),
+            'name': 'Новый рецепт',
+            'text': 'Текст',
+            'cooking_time': 5,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 1)
@@ -0,0 +1,80 @@
+import base64
+from unittest import mock
+
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile,
+    TemporaryUploadedFile
+)
+from django.test import SimpleTestCase, override_settings
+from rest_framework.exceptions import ValidationError
+
+from api.fields import Base64ImageField
+
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJ'
+    'AAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg"></svg>'
+
+
+def data_uri(content, format='png'):
+    return f'data:image/{format};base64,' + base64.b64encode(
+        content
+    ).decode()
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+    """Декодирование изображений из base64."""
+
+    def setUp(self):
+        self.field = Base64ImageField()
+
+    def assertFails(self, data, code):
+        with self.assertRaises(ValidationError) as context:
+            self.field.decode(data)
+        self.assertEqual(context.exception.detail[0].code, code)
+
+    def test_decodes_in_memory(self):
+        file = self.field.decode(data_uri(PNG))
+        self.assertIsInstance(file, InMemoryUploadedFile)
+        self.assertEqual(file.name, 'temp.png')
+        self.assertEqual(file.size, len(PNG))
+        self.assertEqual(file.read(), PNG)
+
+    def test_decodes_by_chunks(self):
+        with mock.patch('api.fields.CHUNK_LENGTH', 16):
+            file = self.field.decode(data_uri(PNG))
+        self.assertEqual(file.read(), PNG)
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=16)
+    def test_large_file_goes_to_disk(self):
+        file = self.field.decode(data_uri(PNG))
+        self.addCleanup(file.close)
+        self.assertIsInstance(file, TemporaryUploadedFile)
+        self.assertEqual(file.size, len(PNG))
+        self.assertEqual(file.read(), PNG)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=16)
+    def test_too_large(self):
+        self.assertFails(data_uri(PNG), 'too_large')
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=16)
+    def test_too_large_checked_before_decoding(self):
+        self.assertFails(
+            'data:image/png;base64,' + '!' * 64, 'too_large'
+        )
+
+    def test_signature_mismatch(self):
+        self.assertFails(data_uri(SVG), 'invalid_format')
+
+    def test_declared_format_not_allowed(self):
+        self.assertFails(data_uri(SVG, 'svg+xml'), 'invalid_format')
+
+    def test_invalid_characters(self):
+        self.assertFails('data:image/png;base64,iVBO!!!!', 'invalid_base64')
+
+    def test_missing_padding(self):
+        self.assertFails(data_uri(PNG).rstrip('='), 'invalid_base64')
+
+    def test_missing_base64_prefix(self):
+        self.assertFails('data:image/png,' + 'A' * 8, 'invalid_base64')
@@ -0,0 +1,71 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from foodgram.storage import media_storage
+from recipes.media import FILE_FIELDS, release_files
+from recipes.models import Recipe
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+RECIPES = 3
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_DELETE_GRACE_PERIOD=-1)
+class ReleaseFilesTest(TestCase):
+    """Освобождение файлов проверяется один раз на транзакцию."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        self.names = [
+            media_storage.save(
+                'recipes/image.png', ContentFile(f'image {number}'.encode())
+            )
+            for number in range(RECIPES)
+        ]
+        self.recipes = [
+            Recipe.objects.create(
+                author=self.author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=10, image=name
+            )
+            for number, name in enumerate(self.names)
+        ]
+
+    def test_one_callback_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                for recipe in self.recipes:
+                    recipe.delete()
+        self.assertEqual(len(callbacks), 1)
+        with CaptureQueriesContext(connection) as context:
+            callbacks[0]()
+        self.assertLessEqual(len(context.captured_queries), len(FILE_FIELDS))
+        for name in self.names:
+            self.assertFalse(media_storage.exists(name))
+
+    def test_referenced_file_is_kept(self):
+        shared = self.names[0]
+        Recipe.objects.filter(pk=self.recipes[1].pk).update(image=shared)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[0].delete()
+        self.assertTrue(media_storage.exists(shared))
+
+    @override_settings(MEDIA_DELETE_GRACE_PERIOD=3600)
+    def test_fresh_file_is_kept_without_queries(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            release_files(self.names)
+        with self.assertNumQueries(0):
+            callbacks[0]()
+        for name in self.names:
+            self.assertTrue(media_storage.exists(name))
@@ -0,0 +1,209 @@
+import shutil
+import tempfile
+from collections import Counter
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.metrics import fingerprint
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag
+)
+from users.models import Subscriber, User
+from .query_budgets import BUDGETS, PAGE_SIZES
+
+MEDIA_ROOT = tempfile.mkdtemp()
+PREFIX = 'budget'
+PASSWORD = 'Budget-password-1'
+NEW_PASSWORD = 'Budget-password-2'
+INGREDIENTS_IN_RECIPE = 10
+TRANSACTION_STATEMENTS = (
+    'BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT',
+)
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJ'
+    'AAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+
+def report(queries):
+    """Нумерованный список SQL с отметкой повторяющихся запросов."""
+    repeats = Counter(fingerprint(sql) for sql in queries)
+    lines = []
+    for number, sql in enumerate(queries, 1):
+        count = repeats[fingerprint(sql)]
+        mark = f' [повторяется {count} раз]' if count > 1 else ''
+        lines.append(f'{number}. {sql}{mark}')
+    return '\n'.join(lines)
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class QueryBudgetTest(TestCase):
+    """Число запросов эндпоинтов не превышает бюджетов из BUDGETS.
+
+    Тесты создаются по одному на строку таблицы.
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создает данные, на которых видны запросы в цикле.
+
+        Страницы заполнены целиком, у рецептов по нескольку тэгов
+        и ингредиентов, пользователь подписан на всех авторов,
+        кроме одного.
+        """
+        call_command(
+            'generate_data', users=60, recipes=120, tags=5,
+            ingredients=INGREDIENTS_IN_RECIPE * 2, subscriptions=5,
+            favorites=5, carts=5, seed=1, prefix=PREFIX, stdout=StringIO()
+        )
+        users = User.objects.filter(username__startswith=PREFIX)
+        user = users.order_by('id').first()
+        user.set_password(PASSWORD)
+        user.save()
+        author = users.exclude(pk=user.pk).order_by('-id').first()
+        Subscriber.objects.bulk_create(
+            [
+                Subscriber(user=user, author=other)
+                for other in users.exclude(pk__in=(user.pk, author.pk))
+            ],
+            ignore_conflicts=True
+        )
+        Subscriber.objects.filter(user=user, author=author).delete()
+        recipes = Recipe.objects.exclude(author=user).order_by('id')
+        favorite, in_cart, recipe = recipes[:3]
+        Favorite.objects.filter(user=user, recipe=recipe).delete()
+        ShoppingCart.objects.filter(user=user, recipe=recipe).delete()
+        Favorite.objects.get_or_create(user=user, recipe=favorite)
+        ShoppingCart.objects.get_or_create(user=user, recipe=in_cart)
+        ingredients = list(
+            Ingredient.objects.order_by('id')[:INGREDIENTS_IN_RECIPE]
+        )
+        tags = list(Tag.objects.filter(slug__startswith=PREFIX)[:2])
+        own_recipe = Recipe.objects.create(
+            author=user, name='Рецепт', text='Описание', cooking_time=10
+        )
+        own_recipe.tags.set(tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=own_recipe, ingredient=item, amount=1)
+            for item in ingredients
+        )
+        followed = users.exclude(pk__in=(user.pk, author.pk)).first()
+        cls.token = Token.objects.create(user=user)
+        cls.context = {
+            'recipe': recipe.pk,
+            'own_recipe': own_recipe.pk,
+            'favorite': favorite.pk,
+            'in_cart': in_cart.pk,
+            'author': author.pk,
+            'followed': followed.pk,
+            'ingredient': ingredients[0].pk,
+            'tag': tags[0].pk,
+            'tag_slug': favorite.tags.first().slug,
+            'user': author.pk,
+            'me': user.pk,
+        }
+        cls.bodies = {
+            'recipe': {
+                'ingredients': [
+                    {'id': item.pk, 'amount': 2} for item in ingredients
+                ],
+                'tags': [tag.pk for tag in tags],
+                'image': IMAGE,
+                'name': 'Новый рецепт',
+                'text': 'Описание',
+                'cooking_time': 15,
+            },
+            'bulk': {
+                'add': list(recipes.values_list('id', flat=True)[3:13]),
+                'remove': [favorite.pk, in_cart.pk],
+            },
+            'new_user': {
+                'email': 'newcomer@example.com',
+                'username': 'newcomer',
+                'first_name': 'Имя',
+                'last_name': 'Фамилия',
+                'password': NEW_PASSWORD,
+            },
+            'profile': {'first_name': 'Новое имя', 'password': NEW_PASSWORD},
+            'password': {
+                'current_password': PASSWORD,
+                'new_password': NEW_PASSWORD,
+            },
+            'avatar': {'avatar': IMAGE},
+        }
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def request(self, method, url, data):
+        """Выполняет запрос и возвращает ответ и выполненные SQL."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if not query['sql'].startswith(TRANSACTION_STATEMENTS)
+        ]
+        return response, queries
+
+    def check_budget(self, budget):
+        if isinstance(budget.queries, dict):
+            cases = [
+                (budget.queries[size], {'limit': size})
+                for size in PAGE_SIZES
+            ]
+        else:
+            cases = [(budget.queries, {})]
+        for limit, extra in cases:
+            url = budget.url.format(**self.context, **extra)
+            with self.subTest(url=url):
+                response, queries = self.request(
+                    budget.method, url, self.bodies.get(budget.data)
+                )
+                self.assertLess(
+                    response.status_code, 400,
+                    getattr(response, 'data', None)
+                )
+                self.assertLessEqual(
+                    len(queries), limit,
+                    f'\n{budget.name}: {len(queries)} запросов при бюджете '
+                    f'{limit}\n{report(queries)}'
+                )
+
+
+def make_test(budget):
+    def test(self):
+        self.check_budget(budget)
+
+    test.__doc__ = f'{budget.method.upper()} {budget.url}'
+    return test
+
+
+for budget in BUDGETS:
+    setattr(
+        QueryBudgetTest, f'test_{budget.name.replace("-", "_")}',
+        make_test(budget)
+    )
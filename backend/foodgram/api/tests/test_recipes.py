@@ -0,0 +1,157 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag
+)
+from users.models import Subscriber, User
+
+RECIPES = 60
+PAGE_SIZES = (1, 6, 50)
+
+
+class RecipeQueryCountTest(TestCase):
+    """Число запросов списка и просмотра рецептов не зависит от данных."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+        authors = [
+            User.objects.create_user(
+                username=f'author{number}',
+                email=f'author{number}@example.com', password='pass'
+            )
+            for number in range(3)
+        ]
+        Subscriber.objects.create(user=cls.user, author=authors[0])
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'Тэг {number}', slug=f'tag{number}')
+            for number in range(3)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(5)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                name=f'Рецепт {number}', text='Описание', cooking_time=10,
+                author=authors[number % len(authors)]
+            )
+            for number in range(RECIPES)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for recipe in recipes for tag in tags[:2]
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe in recipes for ingredient in ingredients[:3]
+        )
+        Favorite.objects.bulk_create(
+            Favorite(user=cls.user, recipe=recipe) for recipe in recipes[::2]
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=cls.user, recipe=recipe)
+            for recipe in recipes[::3]
+        )
+        cls.recipe = recipes[0]
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.anonymous = APIClient()
+        self.authorized = APIClient()
+        self.authorized.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+
+    def assert_queries(self, client, url, number):
+        with self.assertNumQueries(number):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list(self):
+        for name, number in (('anonymous', 5), ('authorized', 6)):
+            for size in PAGE_SIZES:
+                with self.subTest(client=name, limit=size):
+                    response = self.assert_queries(
+                        getattr(self, name), f'/api/recipes/?limit={size}',
+                        number
+                    )
+                    self.assertEqual(len(response.data['results']), size)
+
+    def test_retrieve(self):
+        for name, number in (('anonymous', 4), ('authorized', 5)):
+            with self.subTest(client=name):
+                self.assert_queries(
+                    getattr(self, name), f'/api/recipes/{self.recipe.pk}/',
+                    number
+                )
+
+
+class RecipePartialUpdateTest(TestCase):
+    """PATCH меняет только переданные поля рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.tag = Tag.objects.create(name='Тэг', slug='tag')
+        cls.ingredient = Ingredient.objects.create(
+            name='Ингредиент', measurement_unit='г'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Описание', cooking_time=10
+        )
+        cls.recipe.tags.set([cls.tag])
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=2
+        )
+        cls.token = Token.objects.create(user=cls.author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+
+    def test_text_only(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                self.url, {'text': 'Новое описание'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['text'], 'Новое описание')
+        writes = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+            and ('recipes_recipeingredient' in query['sql']
+                 or 'recipes_recipe_tags' in query['sql'])
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(
+            list(self.recipe.recipe_ingredients.values_list(
+                'ingredient_id', 'amount'
+            )),
+            [(self.ingredient.pk, 2)]
+        )
+        self.assertEqual(list(self.recipe.tags.all()), [self.tag])
+
+    def test_duplicate_ingredients(self):
+        item = {'id': self.ingredient.pk, 'amount': 1}
+        response = self.client.patch(
+            self.url, {'ingredients': [item, item]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
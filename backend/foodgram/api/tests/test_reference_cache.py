@@ -0,0 +1,57 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.autocomplete import ingredient_index
+from api.cache import bump_version, get_version
+from recipes.models import Ingredient
+
+NAME = 'Тестовый ингредиент'
+
+
+@override_settings(INGREDIENT_AUTOCOMPLETE_INDEX=True)
+class ReferenceCacheTest(TestCase):
+    """Кэш справочников сбрасывается после массовой загрузки."""
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index.invalidate()
+        self.client = APIClient()
+
+    def search(self):
+        response = self.client.get('/api/ingredients/', {'name': NAME})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_version_is_stable_on_cold_cache(self):
+        self.assertEqual(get_version('ingredients'), 0)
+        self.assertEqual(get_version('ingredients'), 0)
+        first = self.client.get('/api/tags/')['Last-Modified']
+        cache.clear()
+        self.assertEqual(self.client.get('/api/tags/')['Last-Modified'], first)
+
+    def test_load_data_resets_cached_search(self):
+        self.assertEqual(self.search(), [])
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'ingredients.csv'
+            path.write_text(f'{NAME},г\n', encoding='utf-8')
+            call_command('load_data', path=str(path), stdout=StringIO())
+        self.assertEqual(self.search(), [NAME])
+
+    def test_index_reloads_on_version_change(self):
+        """Индекс другого процесса перечитывается по версии в кэше."""
+        self.assertEqual(ingredient_index.search(NAME, 10), [])
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=NAME, measurement_unit='г')]
+        )
+        self.assertEqual(ingredient_index.search(NAME, 10), [])
+        bump_version('ingredients')
+        self.assertEqual(
+            [item['name'] for item in ingredient_index.search(NAME, 10)],
+            [NAME]
+        )
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.shortlinks import HitCounter, LinkCache, local_cache, resolve
+from recipes.models import Recipe, ShortLink
+from users.models import User
+
+
+class LinkCacheTest(TestCase):
+    """Кэш адресов в памяти процесса."""
+
+    @override_settings(SHORT_LINK_CACHE_SIZE=2)
+    def test_evicts_least_recently_used(self):
+        links = LinkCache()
+        links.set('a', '/a')
+        links.set('b', '/b')
+        links.get('a')
+        links.set('c', '/c')
+        self.assertEqual(links.get('a'), '/a')
+        self.assertIsNone(links.get('b'))
+        self.assertEqual(links.get('c'), '/c')
+
+    def test_delete_keeps_other_codes(self):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        codes = []
+        for number in range(2):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=10
+            )
+            codes.append(ShortLink.objects.create(
+                recipe=recipe, surl=f'code{number}',
+                lurl=recipe.get_absolute_url()
+            ).surl)
+        cache.clear()
+        for code in codes:
+            resolve(code)
+        ShortLink.objects.get(surl=codes[0]).delete()
+        self.assertIsNone(local_cache.get(codes[0]))
+        with self.assertNumQueries(0):
+            resolve(codes[1])
+
+
+class HitCounterTest(TestCase):
+    """Переходы записываются по таймеру без новых запросов."""
+
+    def setUp(self):
+        self.counter = HitCounter()
+        self.addCleanup(self.counter.flush)
+
+    def test_timer_flushes_pending_hits(self):
+        with override_settings(SHORT_LINK_HITS_FLUSH_INTERVAL=0):
+            with mock.patch.object(self.counter, 'flush') as flush:
+                self.counter.add('code')
+                self.counter._timer.join()
+        flush.assert_called_once_with()
+
+    def test_one_timer_until_flush(self):
+        self.counter.add('code')
+        timer = self.counter._timer
+        self.counter.add('code')
+        self.assertIs(self.counter._timer, timer)
+        self.counter.flush()
+        self.assertIsNone(self.counter._timer)
+        timer.join()
+        self.assertTrue(timer.finished.is_set())
+
+    @override_settings(SHORT_LINK_HITS_FLUSH_SIZE=2)
+    def test_flushes_by_size(self):
+        with mock.patch.object(self.counter, 'flush') as flush:
+            self.counter.add('code')
+            flush.assert_not_called()
+            self.counter.add('code')
+        flush.assert_called_once_with()
@@ -2,7 +2,12 @@ from django.urls import include, path
 from rest_framework import routers
 
 from .views import (
-    IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet, short_link
+    IngredientViewSet,
+    RecipeViewSet,
+    TagViewSet,
+    UserViewSet,
+    api_metrics,
+    short_link
 )
 
 app_name = 'api'
@@ -16,6 +21,7 @@ router.register(r'users', UserViewSet, basename='users')
 urlpatterns = [
     path('', include(router.urls)),
     path('recipes/<int:recipe_id>/get-link/', short_link, name='get-link'),
+    path('metrics/', api_metrics, name='metrics'),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
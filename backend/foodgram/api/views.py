@@ -1,64 +1,106 @@
-import random
-from string import ascii_letters
-
-from django.contrib.sites.shortcuts import get_current_site
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.serializers import SetPasswordSerializer
 from rest_framework import status
-from rest_framework.decorators import action, api_view
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import (
+    AllowAny,
+    IsAdminUser,
+    IsAuthenticated
+)
 from rest_framework.response import Response
 
+from .autocomplete import ingredient_index
+from .cache import ReferenceCacheMixin
+from .feed import get_feed_queryset
 from .filters import IngredientFilter, RecipeFilter
-from .paginators import LimitPageNumberPaginator
+from .metrics import SerializationTimingMixin, metrics
+from .paginators import LimitCursorPaginator, LimitPageNumberPaginator
 from .permissions import IsAuthorOrAdminOrReadOnly
 from .serializers import (
     AvatarUserSerializer,
+    BulkRecipesSerializer,
     CustomUserSerializer,
+    IngredientSearchSerializer,
     IngredientSerializer,
+    MetricsSerializer,
     RecipeCreateSerializer,
     RecipeGetSerializer,
+    RecipesLimitSerializer,
     ShortLinkSerializer,
     ShortRecipeSerializer,
     SubscriptionSerializer,
     TagSerializer,
     UserSerializer
 )
+from .shopping_list import (
+    RENDERERS,
+    count_shopping_list,
+    get_shopping_list
+)
+from .shortlinks import get_short_link, hit_counter, resolve
+from recipes.counters import change_counter, recount
 from recipes.models import (
     Favorite,
     Ingredient,
     Recipe,
-    RecipeIngredient,
-    ShortLink,
     ShoppingCart,
     Tag
 )
 from users.models import Subscriber, User
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(
+    SerializationTimingMixin, ReferenceCacheMixin, ReadOnlyModelViewSet
+):
     """Получение тэгов."""
 
+    cache_namespace = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(
+    SerializationTimingMixin, ReferenceCacheMixin, ReadOnlyModelViewSet
+):
     """Получение ингредиентов."""
 
+    cache_namespace = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list' or 'name' not in self.request.query_params:
+            return queryset
+        serializer = IngredientSearchSerializer(
+            data=self.request.query_params
+        )
+        serializer.is_valid(raise_exception=True)
+        return queryset[:serializer.validated_data['limit']]
 
-class RecipeViewSet(ModelViewSet):
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name or not settings.INGREDIENT_AUTOCOMPLETE_INDEX:
+            return super().list(request, *args, **kwargs)
+        serializer = IngredientSearchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(ingredient_index.search(
+            name, serializer.validated_data['limit']
+        ))
+
+
+class RecipeViewSet(SerializationTimingMixin, ModelViewSet):
     """Создание и получение рецептов."""
 
     queryset = Recipe.objects.all()
@@ -66,27 +108,61 @@ class RecipeViewSet(ModelViewSet):
     filterset_class = RecipeFilter
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
 
+    @property
+    def paginator(self):
+        params = self.request.query_params
+        cursor = params.get('pagination') == 'cursor' or 'cursor' in params
+        # Курсор работает только с сортировкой по id.
+        if self.action == 'feed' or cursor and 'ordering' not in params:
+            self.pagination_class = LimitCursorPaginator
+        return super().paginator
+
+    def get_queryset(self):
+        if self.action == 'feed':
+            queryset = get_feed_queryset(self.request.user)
+        else:
+            queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve', 'feed'):
+            return queryset
+        return queryset.with_details(self.request.user)
+
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'feed'):
             return RecipeGetSerializer
         if self.action in ('favorite', 'shopping_cart'):
             return ShortRecipeSerializer
+        if self.action in ('favorite_bulk', 'shopping_cart_bulk'):
+            return BulkRecipesSerializer
         return RecipeCreateSerializer
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    def remove_from_favorite_or_cart(self, request, model, instance):
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        """Рецепты авторов из подписок, новые первыми."""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+        change_counter(User, 'recipes_count', [instance.author_id], -1)
+
+    @transaction.atomic
+    def remove_from_favorite_or_cart(self, request, model, instance, counter):
         """Метод удаления рецепта из избранного/корзины."""
-        obj = model.objects.filter(
+        deleted, _ = model.objects.filter(
             user=request.user, recipe=instance
-        )
-        if obj.exists():
-            obj.delete()
+        ).delete()
+        if deleted:
+            change_counter(Recipe, counter, [instance.pk], -1)
             return Response('Рецепт удален', status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
-    def add_to_favorite_or_cart(self, request, model, instance):
+    @transaction.atomic
+    def add_to_favorite_or_cart(self, request, model, instance, counter):
         """Метод добавления рецепта в избранное/корзину."""
         obj = model.objects.filter(
             user=request.user, recipe=instance
@@ -95,6 +171,7 @@ class RecipeViewSet(ModelViewSet):
             return Response('Рецепт уже добавлен',
                             status=status.HTTP_400_BAD_REQUEST)
         model.objects.create(user=request.user, recipe=instance)
+        change_counter(Recipe, counter, [instance.pk], 1)
         serializer = self.get_serializer(instance)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -104,8 +181,12 @@ class RecipeViewSet(ModelViewSet):
         """Добавление/удаление рецепта в избранное."""
         recipe = get_object_or_404(Recipe, pk=pk)
         if request.method == 'POST':
-            return self.add_to_favorite_or_cart(request, Favorite, recipe)
-        return self.remove_from_favorite_or_cart(request, Favorite, recipe)
+            return self.add_to_favorite_or_cart(
+                request, Favorite, recipe, 'favorites_count'
+            )
+        return self.remove_from_favorite_or_cart(
+            request, Favorite, recipe, 'favorites_count'
+        )
 
     @action(detail=True, methods=['post', 'delete'],
             permission_classes=[IsAuthenticated], url_path='shopping_cart')
@@ -113,32 +194,112 @@ class RecipeViewSet(ModelViewSet):
         """Добавление/удаление рецепта в корзину."""
         recipe = get_object_or_404(Recipe, pk=pk)
         if request.method == 'POST':
-            return self.add_to_favorite_or_cart(request, ShoppingCart, recipe)
-        return self.remove_from_favorite_or_cart(request, ShoppingCart, recipe)
+            return self.add_to_favorite_or_cart(
+                request, ShoppingCart, recipe, 'in_carts_count'
+            )
+        return self.remove_from_favorite_or_cart(
+            request, ShoppingCart, recipe, 'in_carts_count'
+        )
+
+    @transaction.atomic
+    def bulk_favorite_or_cart(self, request, model, counter):
+        """Пакетное добавление/удаление рецептов в избранном/корзине.
+
+        Весь пакет обрабатывается в одной транзакции постоянным
+        числом запросов независимо от количества рецептов.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        add = serializer.validated_data['add']
+        remove = serializer.validated_data['remove']
+        existing = set(Recipe.objects.filter(id__in=add).order_by(
+        ).values_list('id', flat=True))
+        current = set(model.objects.filter(
+            user=request.user, recipe_id__in=add + remove
+        ).order_by().values_list('recipe_id', flat=True))
+        added = [pk for pk in add if pk in existing and pk not in current]
+        removed = [pk for pk in remove if pk in current]
+        if added:
+            model.objects.bulk_create(
+                [model(user=request.user, recipe_id=pk) for pk in added],
+                ignore_conflicts=True
+            )
+        if removed:
+            model.objects.filter(
+                user=request.user, recipe_id__in=removed
+            ).delete()
+        if added or removed:
+            recount(Recipe, counter, model, 'recipe', added + removed)
+        results = [
+            {
+                'id': pk, 'action': 'add',
+                'status': (
+                    'exists' if pk in current
+                    else 'added' if pk in existing else 'not_found'
+                )
+            }
+            for pk in add
+        ] + [
+            {
+                'id': pk, 'action': 'remove',
+                'status': 'removed' if pk in current else 'not_found'
+            }
+            for pk in remove
+        ]
+        return Response({'results': results})
+
+    @action(detail=False, methods=['post'],
+            permission_classes=[IsAuthenticated], url_path='favorite/bulk')
+    def favorite_bulk(self, request):
+        """Пакетное добавление/удаление рецептов в избранное."""
+        return self.bulk_favorite_or_cart(
+            request, Favorite, 'favorites_count'
+        )
+
+    @action(detail=False, methods=['post'],
+            permission_classes=[IsAuthenticated],
+            url_path='shopping_cart/bulk')
+    def shopping_cart_bulk(self, request):
+        """Пакетное добавление/удаление рецептов в корзину."""
+        return self.bulk_favorite_or_cart(
+            request, ShoppingCart, 'in_carts_count'
+        )
+
+    def perform_content_negotiation(self, request, force=False):
+        # Параметр format у выгрузки выбирает формат файла,
+        # а не рендерер DRF.
+        if self.action == 'download_shopping_cart':
+            force = True
+        return super().perform_content_negotiation(request, force)
 
     @action(detail=False, permission_classes=[IsAuthenticated])
     def download_shopping_cart(self, request):
         """Скачивание списка покупок."""
-        shopping_cart = ShoppingCart.objects.filter(
-            user=self.request.user).values('recipe_id')
-        if not shopping_cart:
+        renderer = RENDERERS.get(request.query_params.get('format', 'txt'))
+        if renderer is None:
+            return Response(
+                f'Доступные форматы: {", ".join(RENDERERS)}',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not ShoppingCart.objects.filter(user=request.user).exists():
             return Response(
                 'Список покупок пуст', status=status.HTTP_400_BAD_REQUEST
             )
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__in=shopping_cart
-        ).values('ingredient__name', 'ingredient__measurement_unit').annotate(
-            quantity=Sum('amount')
+        if (
+            renderer.max_rows is not None
+            and count_shopping_list(request.user) > renderer.max_rows
+        ):
+            return Response(
+                f'Список покупок длиннее {renderer.max_rows} строк, '
+                f'выберите другой формат',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        response = StreamingHttpResponse(
+            renderer().render(get_shopping_list(request.user)),
+            content_type=renderer.content_type
         )
-        groceries_list = ''
-        for item in ingredients:
-            groceries_list += (
-                f'{item.get("ingredient__name")} - {item.get("quantity")}'
-                f'{item.get("ingredient__measurement_unit")}.\n')
-        file = 'Необходимо купить:\n' + groceries_list
-        response = HttpResponse(file, content_type="text/plain")
         response['Content-Disposition'] = (
-            'attachment; filename=file.txt'
+            f'attachment; filename=file.{renderer.extension}'
         )
         return response
 
@@ -147,36 +308,41 @@ class RecipeViewSet(ModelViewSet):
 def short_link(request, recipe_id):
     """Получение короткой ссылки."""
     recipe = get_object_or_404(Recipe, id=recipe_id)
-    if ShortLink.objects.filter(lurl=recipe.get_absolute_url()).exists():
-        serializer = ShortLinkSerializer(
-            ShortLink.objects.get(lurl=recipe.get_absolute_url())
-        )
-        return Response(serializer.data)
-    domain = request.scheme + "://" + request.META.get('HTTP_HOST') + '/s/'
-    surl = domain + (''.join(random.sample(ascii_letters, k=7)))
-    link, _ = ShortLink.objects.get_or_create(
-        lurl=recipe.get_absolute_url(),
-        surl=surl
+    serializer = ShortLinkSerializer(
+        get_short_link(recipe), context={'request': request}
     )
-    serializer = ShortLinkSerializer(link)
     return Response(serializer.data)
 
 
 def get_full_link(request, short_link):
     """Получение оригинальной ссылки."""
-    domain = request.scheme + "://" + get_current_site(request).name + '/s/'
-    link = get_object_or_404(ShortLink, surl=domain + short_link)
-    link = link.lurl.replace('/api', '', 1)[:-1]
-    return redirect(link)
+    url = resolve(short_link)
+    hit_counter.add(short_link)
+    return redirect(url)
+
 
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def api_metrics(request):
+    """Самые медленные обработчики и повторяющиеся запросы к БД."""
+    if request.method == 'DELETE':
+        metrics.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    serializer = MetricsSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    return Response(metrics.snapshot(**serializer.validated_data))
 
-class UserViewSet(ModelViewSet):
+
+class UserViewSet(SerializationTimingMixin, ModelViewSet):
     """Работа с пользователями."""
 
     queryset = User.objects.all()
     pagination_class = LimitPageNumberPaginator
     permission_classes = (IsAuthenticated,)
 
+    def get_queryset(self):
+        return super().get_queryset().with_subscription(self.request.user)
+
     def get_permissions(self):
         if self.action in ('retrieve', 'list', 'create'):
             return (AllowAny(),)
@@ -189,10 +355,32 @@ class UserViewSet(ModelViewSet):
             return AvatarUserSerializer
         elif self.action == 'set_password':
             return SetPasswordSerializer
-        elif self.action in ('subscribe', 'subscribtions'):
+        elif self.action in ('subscribe', 'subscriptions'):
             return SubscriptionSerializer
         return UserSerializer
 
+    def get_recipes_limit(self):
+        """Возвращает проверенное значение параметра recipes_limit."""
+        serializer = RecipesLimitSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data.get('recipes_limit')
+
+    def with_recipes(self, queryset, recipes_limit):
+        """Добавляет к авторам первые recipes_limit их рецептов.
+
+        Рецепты всех авторов страницы загружаются одним запросом:
+        оконная функция нумерует рецепты внутри каждого автора.
+        """
+        recipes = Recipe.objects.all()
+        if recipes_limit is not None:
+            recipes = recipes.annotate(row_number=Window(
+                RowNumber(), partition_by=F('author'),
+                order_by=F('id').desc()
+            )).filter(row_number__lte=recipes_limit)
+        return queryset.prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
+
     @action(detail=False, url_path='me')
     def user_self_profile(self, request):
         """Просмотр информации о пользователе."""
@@ -211,7 +399,8 @@ class UserViewSet(ModelViewSet):
             serializer.is_valid(raise_exception=True)
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        user.avatar.delete()
+        user.avatar = None
+        user.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(methods=['post', 'delete'], detail=True)
@@ -221,10 +410,14 @@ class UserViewSet(ModelViewSet):
         author = get_object_or_404(User, pk=pk)
         instance = Subscriber.objects.filter(author=author, user=user)
         if request.method == 'POST':
+            recipes_limit = self.get_recipes_limit()
             if instance.exists():
                 return Response('Вы уже подписаны',
                                 status=status.HTTP_400_BAD_REQUEST)
             Subscriber.objects.create(user=user, author=author)
+            author = self.with_recipes(
+                self.get_queryset(), recipes_limit
+            ).get(pk=author.pk)
             serializer = self.get_serializer(author)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         if instance:
@@ -237,12 +430,13 @@ class UserViewSet(ModelViewSet):
     @action(detail=False)
     def subscriptions(self, request):
         """Просмотр подписок пользователя."""
-        user = self.request.user
-        subscriptions = User.objects.filter(following__user=user)
-        list = self.paginate_queryset(subscriptions)
-        serializer = SubscriptionSerializer(
-            list, many=True, context={'request': request}
+        recipes_limit = self.get_recipes_limit()
+        subscriptions = self.with_recipes(
+            self.get_queryset().filter(following__user=self.request.user),
+            recipes_limit
         )
+        page = self.paginate_queryset(subscriptions)
+        serializer = self.get_serializer(page, many=True)
         return self.get_paginated_response(serializer.data)
 
     @action(methods=['post'], detail=False)
@@ -14,7 +14,10 @@ DEBUG = os.getenv('DEBUG', 'False') == 'True'
 
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '127.0.0.1,localhost').split(',')
 
-CSRF_TRUSTED_ORIGINS = os.getenv('CSRF_TRUSTED_ORIGINS', '').split(',')
+CSRF_TRUSTED_ORIGINS = [
+    origin for origin in os.getenv('CSRF_TRUSTED_ORIGINS', '').split(',')
+    if origin
+]
 
 USERNAME_MAX_LENGTH = 150
 EMAIL_MAX_LENGTH = 254
@@ -33,6 +36,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
@@ -40,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,24 +72,44 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
-"""DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+if os.getenv('DB_ENGINE', 'postgresql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB'),
+            'USER': os.getenv('POSTGRES_USER'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
+            'HOST': os.getenv('DB_HOST'),
+            'PORT': os.getenv('DB_PORT'),
+        }
     }
-}"""
 
-DATABASES = {
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.getenv('POSTGRES_DB'),
-        'USER': os.getenv('POSTGRES_USER'),
-        'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
-        'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT'),
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
     }
 }
 
+PAGINATION_COUNT_CACHE_TTL = int(os.getenv('PAGINATION_COUNT_CACHE_TTL', 0))
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_COUNT_ESTIMATE_THRESHOLD', 0)
+)
+
+# Версии справочников хранятся в кэше. При нескольких процессах
+# нужен общий бэкенд (CACHE_BACKEND), иначе изменения, сделанные
+# в одном процессе, другие увидят только через этот таймаут.
+REFERENCE_CACHE_TIMEOUT = int(os.getenv('REFERENCE_CACHE_TIMEOUT', 300))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -114,9 +139,37 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Файлы, записанные или повторно сохраненные недавно, не удаляются:
+# на них может ссылаться еще не зафиксированная транзакция.
+MEDIA_DELETE_GRACE_PERIOD = int(os.getenv('MEDIA_DELETE_GRACE_PERIOD', 3600))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+INGREDIENT_SEARCH_LIMIT = 50
+INGREDIENT_SEARCH_MAX_LIMIT = 500
+
+INGREDIENT_AUTOCOMPLETE_INDEX = (
+    os.getenv('INGREDIENT_AUTOCOMPLETE_INDEX', 'False') == 'True'
+)
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.getenv('IMAGE_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+)
+IMAGE_UPLOAD_FORMATS = ('jpeg', 'jpg', 'png', 'gif', 'webp')
+IMAGE_MAX_SIZE = 1600
+IMAGE_THUMBNAIL_SIZE = 400
+IMAGE_PIPELINE_WORKERS = int(os.getenv('IMAGE_PIPELINE_WORKERS', 2))
+IMAGE_PIPELINE_SYNC = os.getenv('IMAGE_PIPELINE_SYNC', 'False') == 'True'
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+# PDF собирается в памяти целиком, поэтому длина списка ограничена.
+SHOPPING_LIST_PDF_MAX_ROWS = int(
+    os.getenv('SHOPPING_LIST_PDF_MAX_ROWS', 1000)
+)
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -131,3 +184,31 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
 }
+
+SHORT_LINK_CACHE_SIZE = int(os.getenv('SHORT_LINK_CACHE_SIZE', 4096))
+SHORT_LINK_CACHE_TIMEOUT = 24 * 60 * 60
+SHORT_LINK_HITS_FLUSH_SIZE = int(
+    os.getenv('SHORT_LINK_HITS_FLUSH_SIZE', 1000)
+)
+SHORT_LINK_HITS_FLUSH_INTERVAL = int(
+    os.getenv('SHORT_LINK_HITS_FLUSH_INTERVAL', 60)
+)
+
+RANKING_TRENDING_WINDOW_DAYS = int(
+    os.getenv('RANKING_TRENDING_WINDOW_DAYS', 7)
+)
+RANKING_TRENDING_HALF_LIFE_HOURS = int(
+    os.getenv('RANKING_TRENDING_HALF_LIFE_HOURS', 24)
+)
+
+FEED_CACHE_FOLLOWING_THRESHOLD = int(
+    os.getenv('FEED_CACHE_FOLLOWING_THRESHOLD', 1000)
+)
+FEED_CACHE_SIZE = 1000
+FEED_CACHE_TIMEOUT = 60
+
+BULK_RECIPES_MAX_SIZE = 100
+
+API_METRICS = os.getenv('API_METRICS', 'False') == 'True'
+API_METRICS_TOP = 10
+API_METRICS_REPEAT_THRESHOLD = 5
@@ -0,0 +1,50 @@
+"""Хранилище медиафайлов с адресацией по содержимому."""
+
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, называющее файлы по SHA-256 их содержимого.
+
+    Файл сохраняется как <каталог>/<две первые цифры хэша>/<хэш>.<расш>,
+    поэтому одинаковые загрузки занимают место на диске один раз.
+    Повторное сохранение существующего файла обновляет время его
+    изменения, по которому recipes.media откладывает удаление.
+    """
+
+    def get_hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_hashed_name(name, content)
+        if self.exists(name):
+            self.touch(name)
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def touch(self, name):
+        """Обновляет время изменения файла."""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            pass
+
+
+media_storage = ContentAddressedStorage()
@@ -10,7 +10,7 @@ from api.views import get_full_link
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-    path('s/<str:short_link>/', get_full_link)
+    path('s/<str:short_link>/', get_full_link, name='short-link')
 ]
 
 if settings.DEBUG:
@@ -1,15 +1,19 @@
 """Настройки админки."""
 
 from django.contrib import admin
+from django.db import transaction
 
+from .counters import change_counter, recount
 from .models import (
     RecipeIngredient,
     Recipe,
     Favorite,
     Ingredient,
     ShoppingCart,
+    ShortLink,
     Tag
 )
+from users.models import User
 
 admin.site.disable_action("delete_selected")
 
@@ -17,7 +21,7 @@ admin.site.disable_action("delete_selected")
 @admin.action(description='Удалить %(verbose_name)s')
 def delete(modeladmin, request, obj):
     """Удаляет выбранный объект."""
-    obj.delete()
+    modeladmin.delete_queryset(request, obj)
 
 
 class IngredientAdmin(admin.ModelAdmin):
@@ -49,15 +53,42 @@ class RecipeAdmin(admin.ModelAdmin):
     """Настройки отображения модели Recipe в админке."""
 
     inlines = [RecipeIngredientInline]
-    list_display = ('name', 'author', 'favorites_count')
+    list_display = ('name', 'author', 'favorites_count', 'in_carts_count')
     search_fields = ('name', 'author__username')
     list_filter = ('tags',)
     exclude = ('ingredients',)
     actions = [delete]
 
-    def favorites_count(self, obj):
-        """Возвращает количество избранных."""
-        return obj.favorite.count()
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            change_counter(User, 'recipes_count', [obj.author_id], 1)
+        elif 'author' in form.changed_data:
+            recount(
+                User, 'recipes_count', Recipe, 'author',
+                [form.initial['author'], obj.author_id]
+            )
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        change_counter(User, 'recipes_count', [obj.author_id], -1)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        authors = set(queryset.values_list('author_id', flat=True))
+        super().delete_queryset(request, queryset)
+        recount(User, 'recipes_count', Recipe, 'author', authors)
+
+
+class ShortLinkAdmin(admin.ModelAdmin):
+    """Настройки отображения модели ShortLink в админке."""
+
+    list_display = ('surl', 'recipe', 'hits')
+    search_fields = ('surl', 'recipe__name')
+    readonly_fields = ('hits',)
+    list_select_related = ('recipe',)
 
 
 admin.site.register(Recipe, RecipeAdmin)
@@ -65,3 +96,4 @@ admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Tag, TagAdmin)
 admin.site.register(Favorite)
 admin.site.register(ShoppingCart)
+admin.site.register(ShortLink, ShortLinkAdmin)
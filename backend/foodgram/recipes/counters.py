@@ -0,0 +1,83 @@
+"""Денормализованные счетчики рецептов и пользователей."""
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Favorite, Recipe, ShoppingCart
+from users.models import User
+
+# (модель со счетчиком, поле счетчика, учитываемая модель, ее внешний ключ)
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+)
+
+
+def change_counter(model, field, pks, delta):
+    """Изменяет счетчик field у объектов pks на delta одним UPDATE."""
+    model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+def get_actual_count(source, foreign_key, exclude=None):
+    """Подзапрос с фактическим числом связанных объектов.
+
+    exclude - условия для строк, которые не нужно учитывать.
+    """
+    rows = source.objects.filter(**{foreign_key: OuterRef('pk')})
+    if exclude:
+        rows = rows.exclude(**exclude)
+    return Coalesce(
+        Subquery(
+            rows.order_by().values(foreign_key)
+            .annotate(total=Count('pk')).values('total')
+        ),
+        0
+    )
+
+
+def recount(model, field, source, foreign_key, pks):
+    """Пересчитывает счетчик у объектов pks одним UPDATE.
+
+    В отличие от change_counter не зависит от того, сколько строк
+    на самом деле добавили или удалили конкурирующие запросы.
+    """
+    return model.objects.filter(pk__in=pks).update(
+        **{field: get_actual_count(source, foreign_key)}
+    )
+
+
+def recount_without_user(user):
+    """Пересчитывает счетчики рецептов, отмеченных пользователем.
+
+    Вызывается до удаления пользователя: его избранное и корзина
+    удаляются каскадом без сигналов, поэтому счетчики рецептов
+    пересчитываются одним UPDATE на счетчик без учета его записей.
+    """
+    for model, field, source, foreign_key in COUNTERS:
+        if source is Recipe:
+            continue
+        model.objects.filter(
+            pk__in=source.objects.filter(user=user).values(foreign_key)
+        ).update(
+            **{field: get_actual_count(
+                source, foreign_key, exclude={'user': user}
+            )}
+        )
+
+
+def get_drift(model, field, source, foreign_key):
+    """Возвращает объекты, у которых счетчик разошелся с данными."""
+    return model.objects.annotate(
+        actual=get_actual_count(source, foreign_key)
+    ).exclude(**{field: F('actual')})
+
+
+def repair_counter(model, field, source, foreign_key):
+    """Пересчитывает счетчик у разошедшихся объектов."""
+    drift = get_drift(model, field, source, foreign_key)
+    return model.objects.filter(pk__in=drift.values('pk')).update(
+        **{field: get_actual_count(source, foreign_key)}
+    )
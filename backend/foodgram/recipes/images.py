@@ -0,0 +1,150 @@
+"""Фоновая обработка изображений рецептов."""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+RENDITION_EXTENSIONS = {
+    'thumbnail': 'jpg',
+    'image_webp': 'webp',
+}
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    """Возвращает общий пул потоков обработки изображений."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_PIPELINE_WORKERS,
+                thread_name_prefix='image-pipeline'
+            )
+        return _executor
+
+
+def encode(image, format, **options):
+    buffer = BytesIO()
+    image.save(buffer, format=format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def flatten(image):
+    """Переводит изображение в RGB, заливая прозрачность белым."""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def build_renditions(file):
+    """Уменьшает изображение и готовит миниатюру и WebP-версию.
+
+    Возвращает словарь с файлами для полей image (только если
+    оригинал пришлось уменьшить), thumbnail и image_webp.
+    """
+    with Image.open(file) as source:
+        format = source.format
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    renditions = {}
+    max_size = settings.IMAGE_MAX_SIZE
+    if max(image.size) > max_size:
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        renditions['image'] = encode(
+            image if format != 'JPEG' else flatten(image), format
+        )
+    thumbnail = flatten(image)
+    size = settings.IMAGE_THUMBNAIL_SIZE
+    thumbnail.thumbnail((size, size), Image.LANCZOS)
+    renditions['thumbnail'] = encode(thumbnail, 'JPEG', quality=85)
+    renditions['image_webp'] = encode(image, 'WEBP', quality=80)
+    return renditions
+
+
+def process_recipe_image(recipe_id, name):
+    """Обрабатывает изображение рецепта и сохраняет ссылки на версии.
+
+    Если пока шла обработка изображение рецепта сменилось,
+    результат отбрасывается.
+    """
+    from .media import release_files
+    from .models import Recipe
+
+    try:
+        field = Recipe._meta.get_field('image')
+        with field.storage.open(name) as file:
+            renditions = build_renditions(file)
+        stem, extension = os.path.splitext(os.path.basename(name))
+        saved = {}
+        for field_name, content in renditions.items():
+            model_field = Recipe._meta.get_field(field_name)
+            filename = stem + '.' + RENDITION_EXTENSIONS.get(
+                field_name, extension.lstrip('.')
+            )
+            saved[field_name] = model_field.storage.save(
+                model_field.generate_filename(None, filename), content
+            )
+        updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+            **saved
+        )
+        if not updated:
+            release_files(saved.values())
+        elif 'image' in saved:
+            release_files([name])
+    except (OSError, UnidentifiedImageError):
+        logger.exception('Не удалось обработать изображение %s', name)
+
+
+def get_unprocessed_recipes():
+    """Рецепты с изображением, для которых нет миниатюры или WebP.
+
+    Задачи пула теряются при перезапуске процесса, такие рецепты
+    нужно обработать повторно.
+    """
+    from .models import Recipe
+
+    missing = Q()
+    for field_name in RENDITION_EXTENSIONS:
+        missing |= Q(**{f'{field_name}__isnull': True})
+        missing |= Q(**{field_name: ''})
+    return Recipe.objects.exclude(
+        Q(image__isnull=True) | Q(image='')
+    ).filter(missing)
+
+
+def run_in_worker(recipe_id, name):
+    """Обрабатывает изображение в потоке пула и закрывает его соединение."""
+    try:
+        process_recipe_image(recipe_id, name)
+    finally:
+        connection.close()
+
+
+def schedule_recipe_image(recipe):
+    """Ставит обработку изображения рецепта в очередь после коммита."""
+    if not recipe.image:
+        return
+    recipe_id, name = recipe.pk, recipe.image.name
+    if settings.IMAGE_PIPELINE_SYNC:
+        transaction.on_commit(
+            lambda: process_recipe_image(recipe_id, name)
+        )
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(run_in_worker, recipe_id, name)
+    )
@@ -0,0 +1,55 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from foodgram.storage import media_storage
+from recipes.media import FILE_FIELDS, is_stale
+
+
+def walk(storage, directory):
+    """Перебирает все файлы каталога хранилища рекурсивно."""
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield os.path.join(directory, name)
+    for name in directories:
+        yield from walk(storage, os.path.join(directory, name))
+
+
+class Command(BaseCommand):
+    """Удаление медиафайлов, на которые не ссылается ни одна запись."""
+
+    help = 'Удаляет неиспользуемые изображения и сообщает освобожденное место.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько места можно освободить'
+        )
+
+    def handle(self, *args, **options):
+        referenced = set()
+        directories = set()
+        for model, field in FILE_FIELDS:
+            referenced.update(
+                model.objects.exclude(**{f'{field}__isnull': True}).exclude(
+                    **{field: ''}
+                ).values_list(field, flat=True).iterator()
+            )
+            directories.add(
+                model._meta.get_field(field).upload_to.split('/')[0]
+            )
+        files = reclaimed = 0
+        for directory in sorted(directories):
+            for name in walk(media_storage, directory):
+                if name in referenced or not is_stale(name):
+                    continue
+                files += 1
+                reclaimed += media_storage.size(name)
+                if not options['dry_run']:
+                    media_storage.delete(name)
+        action = 'Можно освободить' if options['dry_run'] else 'Освобождено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {reclaimed} байт, неиспользуемых файлов: {files}'
+        ))
@@ -0,0 +1,264 @@
+import random
+from itertools import accumulate, islice
+from time import monotonic
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.autocomplete import ingredient_index
+from api.cache import bump_version
+from recipes.counters import COUNTERS, repair_counter
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag
+)
+from recipes.rankings import update_rankings
+from users.models import Subscriber, User
+
+PASSWORD = 'benchmark-password'
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def popularity_picker(rng, population):
+    """Возвращает функцию выбора k элементов с предпочтением первых.
+
+    Вес элемента обратно пропорционален его позиции, поэтому
+    у немногих авторов и рецептов оказывается большая часть
+    подписчиков и добавлений, как в реальных данных.
+    """
+    cum_weights = list(accumulate(
+        1 / (position + 1) for position in range(len(population))
+    ))
+
+    def pick(count):
+        return rng.choices(population, cum_weights=cum_weights, k=count)
+
+    return pick
+
+
+class Command(BaseCommand):
+    """Генерация синтетических данных для нагрузочных замеров."""
+
+    help = (
+        'Создает пользователей, рецепты, подписки, избранное и корзины '
+        'пакетными INSERT. Результат воспроизводим при одинаковом --seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument(
+            '--ingredients', type=int, default=500,
+            help='Минимальное число ингредиентов в БД'
+        )
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, default=8,
+            help='Среднее число ингредиентов в рецепте'
+        )
+        parser.add_argument(
+            '--tags-per-recipe', type=int, default=2,
+            help='Максимальное число тэгов в рецепте'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=20,
+            help='Среднее число подписок пользователя'
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=30,
+            help='Среднее число избранных рецептов пользователя'
+        )
+        parser.add_argument(
+            '--carts', type=int, default=10,
+            help='Среднее число рецептов в корзине пользователя'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--prefix', default='bench',
+            help='Префикс имен создаваемых пользователей и тэгов'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одном INSERT'
+        )
+
+    def handle(self, *args, **options):
+        for name in ('users', 'recipes', 'tags', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} < 1')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        start = monotonic()
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            tags = self.create_tags(options['tags'])
+            ingredients = self.create_ingredients(options['ingredients'])
+            recipes = self.create_recipes(options['recipes'], users)
+            self.create_recipe_relations(
+                recipes, tags, ingredients, options
+            )
+            self.create_subscriptions(users, options['subscriptions'])
+            for model, name in ((Favorite, 'favorites'),
+                                (ShoppingCart, 'carts')):
+                self.create_user_recipes(model, users, recipes,
+                                         options[name])
+            for model, field, source, foreign_key in COUNTERS:
+                repair_counter(model, field, source, foreign_key)
+        update_rankings(self.batch_size)
+        # bulk_create не отправляет сигналы, сбрасывающие кэш.
+        bump_version('tags')
+        bump_version('ingredients')
+        ingredient_index.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {monotonic() - start:.2f} с'
+        ))
+
+    def bulk_create(self, model, objects, **kwargs):
+        count = 0
+        for batch in batched(objects, self.batch_size):
+            created = model.objects.bulk_create(batch, **kwargs)
+            count += len(created)
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {count}')
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        self.bulk_create(
+            User,
+            (
+                User(
+                    email=f'{self.prefix}{number}@example.com',
+                    username=f'{self.prefix}{number}',
+                    first_name='Имя', last_name=f'Фамилия {number}',
+                    password=password
+                )
+                for number in range(count)
+            ),
+            ignore_conflicts=True
+        )
+        users = list(User.objects.filter(
+            username__startswith=self.prefix
+        ).order_by('id').values_list('id', flat=True)[:count])
+        self.rng.shuffle(users)
+        return users
+
+    def create_tags(self, count):
+        self.bulk_create(
+            Tag,
+            (
+                Tag(name=f'Тэг {number}', slug=f'{self.prefix}-{number}')
+                for number in range(count)
+            ),
+            ignore_conflicts=True
+        )
+        return list(Tag.objects.filter(
+            slug__startswith=f'{self.prefix}-'
+        ).values_list('id', flat=True))
+
+    def create_ingredients(self, count):
+        missing = count - Ingredient.objects.count()
+        if missing > 0:
+            self.bulk_create(
+                Ingredient,
+                (
+                    Ingredient(
+                        name=f'{self.prefix} ингредиент {number}',
+                        measurement_unit=self.rng.choice(('г', 'мл', 'шт'))
+                    )
+                    for number in range(missing)
+                ),
+                ignore_conflicts=True
+            )
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    def create_recipes(self, count, users):
+        authors = popularity_picker(self.rng, users)(count)
+        recipes = [
+            Recipe(
+                name=f'Рецепт {number}',
+                author_id=author,
+                text='Описание рецепта. ' * self.rng.randint(1, 20),
+                cooking_time=self.rng.randint(5, 180)
+            )
+            for number, author in enumerate(authors)
+        ]
+        for batch in batched(recipes, self.batch_size):
+            Recipe.objects.bulk_create(batch)
+        self.stdout.write(f'рецепты: {len(recipes)}')
+        return [recipe.pk for recipe in recipes]
+
+    def create_recipe_relations(self, recipes, tags, ingredients, options):
+        through = Recipe.tags.through
+        average = options['ingredients_per_recipe']
+        self.bulk_create(
+            through,
+            (
+                through(recipe_id=recipe, tag_id=tag)
+                for recipe in recipes
+                for tag in self.rng.sample(
+                    tags,
+                    self.rng.randint(
+                        1, min(options['tags_per_recipe'], len(tags))
+                    )
+                )
+            ),
+            ignore_conflicts=True
+        )
+        self.bulk_create(
+            RecipeIngredient,
+            (
+                RecipeIngredient(
+                    recipe_id=recipe, ingredient_id=ingredient,
+                    amount=self.rng.randint(1, 1000)
+                )
+                for recipe in recipes
+                for ingredient in self.rng.sample(
+                    ingredients,
+                    min(self.rng.randint(1, 2 * average), len(ingredients))
+                )
+            )
+        )
+
+    def get_fan_out(self, average):
+        return min(int(self.rng.expovariate(1 / average)), 10 * average)
+
+    def create_subscriptions(self, users, average):
+        if average < 1:
+            return
+        pick = popularity_picker(self.rng, users)
+        self.bulk_create(
+            Subscriber,
+            (
+                Subscriber(user_id=user, author_id=author)
+                for user in users
+                for author in set(pick(self.get_fan_out(average)))
+                if author != user
+            ),
+            ignore_conflicts=True
+        )
+
+    def create_user_recipes(self, model, users, recipes, average):
+        if average < 1:
+            return
+        popular = recipes[:]
+        self.rng.shuffle(popular)
+        pick = popularity_picker(self.rng, popular)
+        self.bulk_create(
+            model,
+            (
+                model(user_id=user, recipe_id=recipe)
+                for user in users
+                for recipe in set(pick(self.get_fan_out(average)))
+            ),
+            ignore_conflicts=True
+        )
@@ -1,17 +1,119 @@
+import json
 from csv import reader
+from itertools import islice
+from pathlib import Path
+from time import monotonic
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.autocomplete import ingredient_index
+from api.cache import bump_version
 from recipes.models import Ingredient
 
+DEFAULT_PATH = settings.BASE_DIR / 'recipes' / 'data' / 'ingredients.csv'
+READ_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    """Читает пары (название, ед. измерения) из CSV построчно."""
+    for row in reader(file):
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    """Читает пары (название, ед. измерения) из JSON-массива по частям.
+
+    Файл не загружается целиком: объекты массива разбираются
+    по мере чтения очередного блока.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив ингредиентов')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                raise CommandError('Некорректный JSON-файл')
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
 
 class Command(BaseCommand):
     """Добавление ингридиентов в БД."""
 
-    def handle(self, *args, **kwargs):
-        path = 'recipes/data/ingredients.csv'
-        with open(path, 'r', encoding='UTF-8') as ingredients:
-            for row in reader(ingredients):
-                Ingredient.objects.get_or_create(
-                    name=row[0], measurement_unit=row[1],
-                )
-        self.stdout.write(self.style.SUCCESS('Ингридиенты загружены в БД'))
+    help = 'Загружает ингредиенты из CSV или JSON пакетами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=str(DEFAULT_PATH),
+            help='Путь к файлу .csv или .json'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одном INSERT'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Прочитать файл без записи в БД'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        read = READERS.get(Path(path).suffix.lower())
+        if read is None:
+            raise CommandError('Поддерживаются только файлы .csv и .json')
+        try:
+            file = open(path, 'r', encoding='UTF-8')
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть {path}: {error}')
+        before = Ingredient.objects.count()
+        processed = 0
+        start = monotonic()
+        with file:
+            rows = read(file)
+            while batch := list(islice(rows, batch_size)):
+                if not options['dry_run']:
+                    Ingredient.objects.bulk_create(
+                        [
+                            Ingredient(name=name, measurement_unit=unit)
+                            for name, unit in batch
+                        ],
+                        ignore_conflicts=True
+                    )
+                processed += len(batch)
+                self.stdout.write(f'Обработано строк: {processed}')
+        elapsed = monotonic() - start
+        created = Ingredient.objects.count() - before
+        if created:
+            # bulk_create не отправляет сигналы, сбрасывающие кэш.
+            bump_version('ingredients')
+            ingredient_index.invalidate()
+        result = (
+            'Проверка файла завершена' if options['dry_run']
+            else 'Ингридиенты загружены в БД'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{result}: прочитано {processed}, '
+            f'добавлено {created} за {elapsed:.2f} с '
+            f'({processed / max(elapsed, 1e-6):.0f} строк/с)'
+        ))
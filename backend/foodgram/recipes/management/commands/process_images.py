@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.images import get_unprocessed_recipes, process_recipe_image
+
+
+class Command(BaseCommand):
+    """Повторная обработка изображений рецептов."""
+
+    help = (
+        'Создает миниатюры и WebP-версии для рецептов, у которых их нет, '
+        'например, если процесс перезапустился до окончания обработки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int,
+            help='Обработать не больше указанного числа рецептов'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать число необработанных рецептов'
+        )
+
+    def handle(self, *args, **options):
+        if options['limit'] is not None and options['limit'] < 1:
+            raise CommandError('--limit должен быть больше 0')
+        recipes = get_unprocessed_recipes().order_by('id')
+        if options['dry_run']:
+            self.stdout.write(f'Необработанных рецептов: {recipes.count()}')
+            return
+        recipes = recipes.values_list('id', 'image')[:options['limit']]
+        count = 0
+        for recipe_id, name in recipes.iterator():
+            process_recipe_image(recipe_id, name)
+            count += 1
+        remaining = get_unprocessed_recipes().count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено рецептов: {count}, без версий осталось: {remaining}'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import COUNTERS, get_drift, repair_counter
+
+
+class Command(BaseCommand):
+    """Пересчет денормализованных счетчиков."""
+
+    help = 'Находит и исправляет расхождения в счетчиках.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения'
+        )
+
+    def handle(self, *args, **options):
+        for model, field, source, foreign_key in COUNTERS:
+            name = f'{model._meta.label}.{field}'
+            if options['dry_run']:
+                count = get_drift(model, field, source, foreign_key).count()
+                self.stdout.write(f'{name}: расхождений {count}')
+                continue
+            with transaction.atomic():
+                count = repair_counter(model, field, source, foreign_key)
+            self.stdout.write(f'{name}: исправлено {count}')
+        self.stdout.write(self.style.SUCCESS('Проверка счетчиков завершена'))
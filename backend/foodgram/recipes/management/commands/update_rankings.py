@@ -0,0 +1,30 @@
+from time import monotonic
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.rankings import update_rankings
+
+
+class Command(BaseCommand):
+    """Пересчет рейтингов рецептов."""
+
+    help = (
+        'Пересчитывает популярность и тренд рецептов. '
+        'Предназначена для запуска по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество рецептов в одном INSERT'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        start = monotonic()
+        total = update_rankings(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинги обновлены: {total} рецептов '
+            f'за {monotonic() - start:.2f} с'
+        ))
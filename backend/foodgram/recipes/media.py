@@ -0,0 +1,102 @@
+"""Учет ссылок на медиафайлы и удаление неиспользуемых."""
+
+from datetime import timedelta
+from threading import local
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from foodgram.storage import media_storage
+from users.models import User
+from .models import Recipe
+
+FILE_FIELDS = (
+    (Recipe, 'image'),
+    (Recipe, 'thumbnail'),
+    (Recipe, 'image_webp'),
+    (User, 'avatar'),
+)
+
+
+def get_referenced(names):
+    """Возвращает имена файлов, на которые ссылаются записи.
+
+    Выполняет по одному запросу на поле из FILE_FIELDS.
+    """
+    referenced = set()
+    for model, field in FILE_FIELDS:
+        referenced.update(
+            model.objects.filter(**{f'{field}__in': names}).values_list(
+                field, flat=True
+            )
+        )
+    return referenced
+
+
+def is_stale(name):
+    """Проверяет, что файл не менялся дольше MEDIA_DELETE_GRACE_PERIOD.
+
+    Одинаковое содержимое хранится в одном файле, поэтому свежий файл
+    может быть только что сохранен другим запросом, транзакция
+    которого еще не зафиксирована, и ссылки на него пока не видны.
+    """
+    try:
+        modified = media_storage.get_modified_time(name)
+    except FileNotFoundError:
+        return False
+    grace = timedelta(seconds=settings.MEDIA_DELETE_GRACE_PERIOD)
+    return timezone.now() - modified > grace
+
+
+class PendingRelease:
+    """Файлы, освобожденные в текущей транзакции.
+
+    Удаляются одним обработчиком on_commit после ее фиксации.
+    """
+
+    def __init__(self):
+        self.names = set()
+
+    def __call__(self):
+        names = {name for name in self.names if is_stale(name)}
+        if not names:
+            return
+        for name in names - get_referenced(names):
+            media_storage.delete(name)
+
+
+_pending = local()
+
+
+def release_files(names):
+    """Удаляет файлы, на которые больше не ссылается ни одна запись.
+
+    Проверка выполняется после фиксации транзакции,
+    чтобы не удалить файл, который еще может понадобиться при откате.
+    Файлы всех вызовов в одной транзакции проверяются вместе.
+    Недавно измененные файлы остаются до запуска collect_media.
+    """
+    names = {name for name in names if name}
+    if not names:
+        return
+    pending = getattr(_pending, 'release', None)
+    registered = pending is not None and any(
+        callback[1] is pending
+        for callback in transaction.get_connection().run_on_commit
+    )
+    if registered:
+        pending.names |= names
+        return
+    pending = _pending.release = PendingRelease()
+    pending.names |= names
+    transaction.on_commit(pending)
+
+
+def get_file_names(instance):
+    """Возвращает имена файлов из файловых полей объекта."""
+    return {
+        field: getattr(instance, field).name
+        for model, field in FILE_FIELDS
+        if isinstance(instance, model)
+    }
@@ -0,0 +1,126 @@
+# Generated by Django 5.0.6 on 2026-10-17 07:13
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Объединяет ингредиенты с одинаковыми названием и ед. измерения."""
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(keep_id=Min('id'), total=Count('id')).filter(total__gt=1)
+    for group in duplicates:
+        extra = Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(id=group['keep_id'])
+        RecipeIngredient.objects.filter(
+            ingredient__in=extra,
+            recipe__in=RecipeIngredient.objects.filter(
+                ingredient_id=group['keep_id']
+            ).values('recipe_id')
+        ).delete()
+        RecipeIngredient.objects.filter(ingredient__in=extra).update(
+            ingredient_id=group['keep_id']
+        )
+        extra.delete()
+
+
+def delete_duplicates(apps, schema_editor):
+    """Оставляет по одной строке на каждое новое уникальное сочетание."""
+    for name, fields in (
+        ('Favorite', ('user', 'recipe')),
+        ('ShoppingCart', ('user', 'recipe')),
+        ('RecipeIngredient', ('recipe', 'ingredient')),
+    ):
+        model = apps.get_model('recipes', name)
+        duplicates = model.objects.values(*fields).annotate(
+            keep_id=Min('id'), total=Count('id')
+        ).filter(total__gt=1).order_by()
+        for group in duplicates:
+            model.objects.filter(
+                **{field: group[field] for field in fields}
+            ).exclude(id=group['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_shortlink_alter_recipe_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='favorite',
+            options={'default_related_name': 'favorite', 'ordering': ['user', 'recipe'], 'verbose_name': 'Избранный рецепт', 'verbose_name_plural': 'избранные рецепты'},
+        ),
+        migrations.AlterModelOptions(
+            name='ingredient',
+            options={'ordering': ['name'], 'verbose_name': 'Ингредиент', 'verbose_name_plural': 'ингредиенты'},
+        ),
+        migrations.AlterModelOptions(
+            name='recipeingredient',
+            options={'default_related_name': 'recipe_ingredients', 'ordering': ['recipe', 'ingredient'], 'verbose_name': 'Ингредиент', 'verbose_name_plural': 'ингредиенты'},
+        ),
+        migrations.AlterModelOptions(
+            name='shoppingcart',
+            options={'default_related_name': 'shopping_cart', 'ordering': ['user', 'recipe'], 'verbose_name': 'Корзина', 'verbose_name_plural': 'корзины покупок'},
+        ),
+        migrations.AlterModelOptions(
+            name='shortlink',
+            options={'ordering': ['-id'], 'verbose_name': 'Короткая ссылка', 'verbose_name_plural': 'короткие ссылки'},
+        ),
+        migrations.AlterModelOptions(
+            name='tag',
+            options={'ordering': ['name'], 'verbose_name': 'Тэг', 'verbose_name_plural': 'тэги'},
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='cooking_time',
+            field=models.IntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(32000)], verbose_name='Время приготовления'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(through='recipes.RecipeIngredient', to='recipes.ingredient', verbose_name='Ингредиенты'),
+        ),
+        migrations.AlterField(
+            model_name='recipeingredient',
+            name='amount',
+            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(32000)], verbose_name='Количество'),
+        ),
+        migrations.AlterField(
+            model_name='shortlink',
+            name='surl',
+            field=models.CharField(max_length=132, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='slug',
+            field=models.SlugField(max_length=32, unique=True, validators=[django.core.validators.RegexValidator(message='Введите корректный идентификатор', regex='^[-a-zA-Z0-9_]+$')], verbose_name='Идентификатор'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('recipe', 'user'), name='unique_recipe_in_favorite'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('recipe', 'user'), name='unique_recipe_in_shopping_cart'),
+        ),
+    ]
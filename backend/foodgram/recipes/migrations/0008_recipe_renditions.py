@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-17 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_ingredient_name_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_webp',
+            field=models.ImageField(blank=True, default=None, null=True, upload_to='recipes/webp/', verbose_name='Изображение WebP'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail',
+            field=models.ImageField(blank=True, default=None, null=True, upload_to='recipes/thumbnails/', verbose_name='Миниатюра'),
+        ),
+    ]
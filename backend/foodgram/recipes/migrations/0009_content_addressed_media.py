@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-17 07:20
+
+import foodgram.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, default=None, null=True, storage=foodgram.storage.ContentAddressedStorage(), upload_to='recipes/'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image_webp',
+            field=models.ImageField(blank=True, db_index=True, default=None, null=True, storage=foodgram.storage.ContentAddressedStorage(), upload_to='recipes/webp/', verbose_name='Изображение WebP'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='thumbnail',
+            field=models.ImageField(blank=True, db_index=True, default=None, null=True, storage=foodgram.storage.ContentAddressedStorage(), upload_to='recipes/thumbnails/', verbose_name='Миниатюра'),
+        ),
+    ]
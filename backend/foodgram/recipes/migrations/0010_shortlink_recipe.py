@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-17 08:05
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+RECIPE_URL = re.compile(r'/recipes/(\d+)/?$')
+
+
+def link_recipes(apps, schema_editor):
+    """Привязывает ссылки к рецептам и оставляет в surl только код."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    ShortLink = apps.get_model('recipes', 'ShortLink')
+    recipes = set(Recipe.objects.values_list('id', flat=True))
+    linked = set()
+    for link in ShortLink.objects.order_by('id').iterator():
+        match = RECIPE_URL.search(link.lurl)
+        recipe_id = int(match.group(1)) if match else None
+        if recipe_id not in recipes or recipe_id in linked:
+            link.delete()
+            continue
+        linked.add(recipe_id)
+        link.recipe_id = recipe_id
+        link.surl = link.surl.rstrip('/').rsplit('/', 1)[-1]
+        link.save(update_fields=['recipe', 'surl'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shortlink',
+            name='recipe',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='short_link', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.RunPython(link_recipes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='shortlink',
+            name='recipe',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='short_link', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AlterField(
+            model_name='shortlink',
+            name='surl',
+            field=models.CharField(max_length=32, unique=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_shortlink_recipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shortlink',
+            name='hits',
+            field=models.PositiveIntegerField(default=0, verbose_name='Переходы'),
+        ),
+    ]
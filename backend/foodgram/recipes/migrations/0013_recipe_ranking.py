@@ -0,0 +1,61 @@
+# Generated by Django 5.0.6 on 2026-10-17 07:27
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Время добавления старых записей неизвестно; дата в прошлом
+# не дает им попасть в окно тренда.
+UNKNOWN_CREATED = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def create_rankings(apps, schema_editor):
+    """Создает рейтинги существующих рецептов по счетчикам."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeRanking = apps.get_model('recipes', 'RecipeRanking')
+    RecipeRanking.objects.bulk_create(
+        RecipeRanking(
+            recipe_id=recipe_id, popularity=favorites + carts
+        )
+        for recipe_id, favorites, carts in Recipe.objects.values_list(
+            'id', 'favorites_count', 'in_carts_count'
+        ).iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=UNKNOWN_CREATED, verbose_name='Добавлен'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=UNKNOWN_CREATED, verbose_name='Добавлен'),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='RecipeRanking',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('popularity', models.PositiveIntegerField(default=0, verbose_name='Популярность')),
+                ('trending', models.FloatField(default=0, verbose_name='Тренд')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Обновлен')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг рецепта',
+                'verbose_name_plural': 'рейтинги рецептов',
+                'indexes': [models.Index(fields=['-popularity', '-recipe'], name='ranking_popularity_idx'), models.Index(fields=['-trending', '-recipe'], name='ranking_trending_idx')],
+            },
+        ),
+        migrations.RunPython(create_rankings, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,9 @@ from django.core.validators import (MinValueValidator,
                                     MaxValueValidator,
                                     RegexValidator)
 from django.db import models
+from django.db.models import Exists, OuterRef, Prefetch, Value
 from django.urls import reverse
+from foodgram.storage import media_storage
 from users.models import User
 
 MIN_AMOUNT = 1
@@ -44,11 +46,49 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'ингредиенты'
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов рецептов."""
+
+    def with_user_flags(self, user):
+        """Добавляет флаги избранного и корзины для пользователя user."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False), is_in_shopping_cart=Value(False)
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        )
+
+    def with_details(self, user):
+        """Добавляет все, что нужно для полного вывода рецепта."""
+        return self.with_user_flags(user).prefetch_related(
+            Prefetch(
+                'author', queryset=User.objects.with_subscription(user)
+            ),
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
+
 class Recipe(models.Model):
     """Класс рецептов."""
 
@@ -57,7 +97,18 @@ class Recipe(models.Model):
         User, verbose_name='Автор', on_delete=models.CASCADE
     )
     image = models.ImageField(
-        upload_to='recipes/', null=True, default=None
+        upload_to='recipes/', null=True, default=None,
+        storage=media_storage, db_index=True
+    )
+    thumbnail = models.ImageField(
+        verbose_name='Миниатюра', upload_to='recipes/thumbnails/',
+        null=True, blank=True, default=None,
+        storage=media_storage, db_index=True
+    )
+    image_webp = models.ImageField(
+        verbose_name='Изображение WebP', upload_to='recipes/webp/',
+        null=True, blank=True, default=None,
+        storage=media_storage, db_index=True
     )
     text = models.TextField(verbose_name='Описание рецепта')
     ingredients = models.ManyToManyField(
@@ -71,12 +122,29 @@ class Recipe(models.Model):
             MaxValueValidator(MAX_COOKING_TIME)
         ]
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном', default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В корзинах', default=0, editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'рецепты'
         default_related_name = 'recipes'
         ordering = ['-id']
+        indexes = [
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipe_favorites_count_idx'
+            ),
+            models.Index(
+                fields=['author', '-id'], name='recipe_author_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -123,6 +191,9 @@ class ShoppingCart(models.Model):
     recipe = models.ForeignKey(
         Recipe, verbose_name='Рецепт', on_delete=models.CASCADE, null=True
     )
+    created = models.DateTimeField(
+        verbose_name='Добавлен', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         verbose_name = 'Корзина'
@@ -149,6 +220,9 @@ class Favorite(models.Model):
     recipe = models.ForeignKey(
         Recipe, on_delete=models.CASCADE, verbose_name='Рецепт'
     )
+    created = models.DateTimeField(
+        verbose_name='Добавлен', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         verbose_name = 'Избранный рецепт'
@@ -167,12 +241,61 @@ class Favorite(models.Model):
 
 
 class ShortLink(models.Model):
-    """Модель короткой ссылки."""
+    """Модель короткой ссылки.
+
+    В surl хранится только код ссылки, адрес сервиса подставляется
+    при выдаче.
+    """
 
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='short_link',
+        verbose_name='Рецепт'
+    )
     lurl = models.URLField(max_length=255)
-    surl = models.CharField(max_length=132, unique=True)
+    surl = models.CharField(max_length=32, unique=True)
+    hits = models.PositiveIntegerField('Переходы', default=0)
 
     class Meta:
         verbose_name = 'Короткая ссылка'
         verbose_name_plural = 'короткие ссылки'
         ordering = ['-id']
+
+
+class RecipeRanking(models.Model):
+    """Предрасчитанные рейтинги рецепта.
+
+    Заполняется командой update_rankings, чтобы выдача по
+    популярности шла по индексу, а не агрегировала избранное.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Рецепт'
+    )
+    popularity = models.PositiveIntegerField(
+        verbose_name='Популярность', default=0
+    )
+    trending = models.FloatField(verbose_name='Тренд', default=0)
+    updated = models.DateTimeField(verbose_name='Обновлен', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'рейтинги рецептов'
+        indexes = [
+            models.Index(
+                fields=['-popularity', '-recipe'],
+                name='ranking_popularity_idx'
+            ),
+            models.Index(
+                fields=['-trending', '-recipe'],
+                name='ranking_trending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.popularity} / {self.trending:.2f}'
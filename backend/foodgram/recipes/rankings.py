@@ -0,0 +1,63 @@
+"""Расчет рейтингов рецептов."""
+
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Favorite, Recipe, RecipeRanking, ShoppingCart
+
+
+def get_trending_scores(now):
+    """Считает тренд рецептов по добавлениям за последнее окно.
+
+    Каждое добавление в избранное или корзину весит
+    0.5 ** (возраст / период полураспада), так что свежие
+    добавления важнее старых.
+    """
+    since = now - timedelta(days=settings.RANKING_TRENDING_WINDOW_DAYS)
+    half_life = timedelta(
+        hours=settings.RANKING_TRENDING_HALF_LIFE_HOURS
+    ).total_seconds()
+    scores = defaultdict(float)
+    for model in (Favorite, ShoppingCart):
+        events = model.objects.filter(
+            created__gte=since, recipe__isnull=False
+        ).order_by().values_list('recipe_id', 'created')
+        for recipe_id, created in events.iterator():
+            age = max((now - created).total_seconds(), 0)
+            scores[recipe_id] += 0.5 ** (age / half_life)
+    return scores
+
+
+def update_rankings(batch_size=1000):
+    """Пересчитывает рейтинги всех рецептов пакетами.
+
+    Популярность - число добавлений рецепта в избранное и корзины
+    по денормализованным счетчикам. Возвращает число рецептов.
+    """
+    now = timezone.now()
+    scores = get_trending_scores(now)
+    recipes = Recipe.objects.order_by().values_list(
+        'id', 'favorites_count', 'in_carts_count'
+    ).iterator(chunk_size=batch_size)
+    total = 0
+    while batch := list(islice(recipes, batch_size)):
+        RecipeRanking.objects.bulk_create(
+            [
+                RecipeRanking(
+                    recipe_id=recipe_id,
+                    popularity=favorites + carts,
+                    trending=scores.get(recipe_id, 0),
+                    updated=now
+                )
+                for recipe_id, favorites, carts in batch
+            ],
+            update_conflicts=True,
+            unique_fields=['recipe'],
+            update_fields=['popularity', 'trending', 'updated']
+        )
+        total += len(batch)
+    return total
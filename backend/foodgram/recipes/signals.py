@@ -0,0 +1,61 @@
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save
+)
+from django.dispatch import receiver
+
+from .counters import recount_without_user
+from .media import get_file_names, release_files
+from .models import Recipe, RecipeRanking
+from users.models import User
+
+
+@receiver(pre_save, sender=Recipe)
+@receiver(pre_save, sender=User)
+def remember_files(sender, instance, update_fields=None, **kwargs):
+    """Запоминает файлы объекта до сохранения."""
+    fields = [
+        field for field in get_file_names(instance)
+        if update_fields is None or field in update_fields
+    ]
+    if instance.pk is None or not fields:
+        instance._stored_files = {}
+        return
+    instance._stored_files = sender.objects.filter(
+        pk=instance.pk
+    ).values(*fields).first() or {}
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=User)
+def release_replaced_files(sender, instance, **kwargs):
+    """Освобождает файлы, замененные при сохранении."""
+    current = get_file_names(instance)
+    release_files(
+        name for field, name in getattr(
+            instance, '_stored_files', {}
+        ).items()
+        if name != current[field]
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=User)
+def release_deleted_files(sender, instance, **kwargs):
+    """Освобождает файлы удаленного объекта."""
+    release_files(get_file_names(instance).values())
+
+
+@receiver(pre_delete, sender=User)
+def recount_user_marks(sender, instance, **kwargs):
+    """Исключает избранное и корзину пользователя из счетчиков рецептов."""
+    recount_without_user(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def create_ranking(sender, instance, created, **kwargs):
+    """Создает пустой рейтинг нового рецепта до следующего пересчета."""
+    if created:
+        RecipeRanking.objects.create(recipe=instance)
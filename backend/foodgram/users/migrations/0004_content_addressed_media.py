@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-17 07:20
+
+import foodgram.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_user_managers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(db_index=True, default=None, null=True, storage=foodgram.storage.ContentAddressedStorage(), upload_to='users/'),
+        ),
+    ]
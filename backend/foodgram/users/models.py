@@ -1,5 +1,24 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import Exists, OuterRef, Value
+
+from foodgram.storage import media_storage
+
+
+class UserQuerySet(models.QuerySet):
+    """Набор запросов пользователей."""
+
+    def with_subscription(self, user):
+        """Добавляет флаг подписки пользователя user на автора."""
+        if not user.is_authenticated:
+            return self.annotate(is_subscribed=Value(False))
+        return self.annotate(is_subscribed=Exists(
+            Subscriber.objects.filter(user=user, author=OuterRef('pk'))
+        ))
+
+
+class CustomUserManager(UserManager.from_queryset(UserQuerySet)):
+    """Менеджер пользователей с дополнительными аннотациями."""
 
 
 class User(AbstractUser):
@@ -16,8 +35,14 @@ class User(AbstractUser):
     first_name = models.CharField(max_length=150, verbose_name='Имя')
     last_name = models.CharField(max_length=150, verbose_name='Фамилия')
     avatar = models.ImageField(
-        upload_to='users/', null=True, default=None
+        upload_to='users/', null=True, default=None,
+        storage=media_storage, db_index=True
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов', default=0, editable=False
+    )
+
+    objects = CustomUserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username',)